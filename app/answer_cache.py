@@ -0,0 +1,99 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional, Tuple
+from .config import config
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a query"""
+    return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?.!")
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class _Entry(NamedTuple):
+    response: Any
+    created: float
+    vector: Optional[List[float]]
+
+class AnswerCache:
+    """TTL/LRU cache of generated RAG answers.
+
+    Entries live under a scope: the case ID, the LLM configuration and a
+    version stamp of the case's rows and documents. When the case changes
+    its stamp changes, so stale answers are never matched and eventually
+    age out. Within a scope a query matches on its normalized text or, when
+    ``similarity`` is set, on the cosine similarity of its embedding.
+    """
+
+    def __init__(self, capacity: int = 256, ttl: float = 900, similarity: float = 0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries: "OrderedDict[Tuple[Tuple, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl > 0 and now - entry.created > self.ttl
+
+    def get(self, scope: Tuple, query: str, vector: Optional[List[float]] = None) -> Optional[Any]:
+        """Cached response for the query, or None"""
+        if not self.enabled:
+            return None
+        key = (scope, normalize_query(query))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry is None and vector is not None and self.similarity > 0:
+                key, entry = self._nearest(scope, vector, now)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry.response
+
+    def _nearest(self, scope: Tuple, vector: List[float], now: float):
+        best_key, best_entry, best_score = None, None, self.similarity
+        for key, entry in self._entries.items():
+            if key[0] != scope or entry.vector is None or self._expired(entry, now):
+                continue
+            score = _cosine(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_entry, best_score = key, entry, score
+        return best_key, best_entry
+
+    def put(self, scope: Tuple, query: str, response: Any, vector: Optional[List[float]] = None):
+        if not self.enabled:
+            return
+        key = (scope, normalize_query(query))
+        with self._lock:
+            self._entries[key] = _Entry(response, time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, case_id: Optional[str] = None):
+        """Drop cached answers for a case, or all of them"""
+        with self._lock:
+            if case_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0][0] == case_id]:
+                del self._entries[key]
+
+# Global answer cache
+answer_cache = AnswerCache(
+    capacity=config.answer_cache_size,
+    ttl=config.answer_cache_ttl,
+    similarity=config.answer_cache_similarity
+)
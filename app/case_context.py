@@ -0,0 +1,183 @@
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+from .models import Case, Party, TimelineEvent, FinancialRecord, CaseStats, SystemStats
+
+def case_details_query(db: Session) -> Query:
+    """Query for cases with parties, events and financials eager-loaded.
+
+    Parties are joined into the case row; events and financials each come
+    from one ``IN`` query, since joining several collections at once would
+    multiply the rows returned (parties x events x financials).
+    """
+    return db.query(Case).options(
+        joinedload(Case.parties),
+        selectinload(Case.events),
+        selectinload(Case.financials)
+    )
+
+def load_case(db: Session, case_id: str) -> Optional[Case]:
+    """Load a case with all of its related records, or None if it doesn't exist"""
+    return case_details_query(db).filter(Case.case_id == case_id).first()
+
+def serialize_case_context(case: Case) -> Dict[str, Any]:
+    """Full case context as returned by the legal.get_case_context MCP method"""
+    return {
+        "case": {
+            "case_id": case.case_id,
+            "case_type": case.case_type,
+            "date_filed": case.date_filed.isoformat() if case.date_filed else None,
+            "status": case.status,
+            "case_summary": case.case_summary
+        },
+        "parties": [
+            {
+                "party_id": p.party_id,
+                "party_type": p.party_type,
+                "name": p.name,
+                "contact_info": p.contact_info
+            } for p in case.parties
+        ],
+        "events": [
+            {
+                "event_id": e.event_id,
+                "event_date": e.event_date.isoformat() if e.event_date else None,
+                "description": e.description
+            } for e in case.events
+        ],
+        "financials": [
+            {
+                "record_id": f.record_id,
+                "record_type": f.record_type,
+                "amount": f.amount,
+                "description": f.description
+            } for f in case.financials
+        ]
+    }
+
+def load_all_cases(db: Session) -> List[Case]:
+    """Load every case with its details in bulk.
+
+    Related rows are fetched with one ``IN`` query per table instead of one
+    query per case, so the cost grows with the number of rows returned.
+    """
+    return load_cases(db)
+
+def load_cases(db: Session, case_ids: Optional[Iterable[str]] = None, status: Optional[str] = None) -> List[Case]:
+    """Load the cases matching the given IDs and/or status, with details, in bulk"""
+    query = db.query(Case).options(
+        selectinload(Case.parties),
+        selectinload(Case.events),
+        selectinload(Case.financials)
+    )
+    if case_ids is not None:
+        query = query.filter(Case.case_id.in_(list(case_ids)))
+    if status:
+        query = query.filter(Case.status == status)
+    return query.order_by(Case.case_id).all()
+
+def _empty_totals() -> Dict[str, int]:
+    return {"parties_count": 0, "events_count": 0, "financials_count": 0, "total_amount": 0}
+
+def case_totals(db: Session, case_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, int]]:
+    """Per-case record counts and financial totals computed with GROUP BY"""
+    case_ids = list(case_ids) if case_ids is not None else None
+    totals: Dict[str, Dict[str, int]] = {}
+
+    def grouped(*columns):
+        query = db.query(*columns).group_by(columns[0])
+        if case_ids is not None:
+            query = query.filter(columns[0].in_(case_ids))
+        return query.all()
+
+    for case_id, count in grouped(Party.case_id, func.count(Party.party_id)):
+        totals.setdefault(case_id, _empty_totals())["parties_count"] = count
+    for case_id, count in grouped(TimelineEvent.case_id, func.count(TimelineEvent.event_id)):
+        totals.setdefault(case_id, _empty_totals())["events_count"] = count
+    for case_id, count, amount in grouped(
+        FinancialRecord.case_id,
+        func.count(FinancialRecord.record_id),
+        func.coalesce(func.sum(FinancialRecord.amount), 0)
+    ):
+        entry = totals.setdefault(case_id, _empty_totals())
+        entry["financials_count"] = count
+        entry["total_amount"] = int(amount)
+    return totals
+
+def stored_case_stats(db: Session) -> Dict[str, Dict[str, int]]:
+    """Per-case counts and totals read from the materialized case_stats table"""
+    return {
+        row.case_id: {
+            "parties_count": row.parties_count or 0,
+            "events_count": row.events_count or 0,
+            "financials_count": row.financials_count or 0,
+            "total_amount": row.total_amount or 0
+        }
+        for row in db.query(CaseStats).all()
+    }
+
+def case_version(db: Session, case_id: str) -> Optional[str]:
+    """Stamp that changes whenever the case or its child rows change"""
+    updated_at = db.query(CaseStats.updated_at).filter(CaseStats.case_id == case_id).scalar()
+    return updated_at.isoformat() if updated_at else None
+
+def system_rollup(db: Session) -> Dict[str, Dict[str, int]]:
+    """Global totals per case status read from the system_stats rollup"""
+    return {
+        row.status: {
+            "cases_count": row.cases_count or 0,
+            "parties_count": row.parties_count or 0,
+            "events_count": row.events_count or 0,
+            "financials_count": row.financials_count or 0,
+            "total_amount": row.total_amount or 0
+        }
+        for row in db.query(SystemStats).all()
+    }
+
+def status_counts(db: Session) -> Dict[str, int]:
+    """Number of cases per status"""
+    return {status: values["cases_count"] for status, values in system_rollup(db).items()}
+
+def total_financial_amount_all(db: Session) -> int:
+    """Sum of every financial record amount"""
+    return sum(values["total_amount"] for values in system_rollup(db).values())
+
+def summarize_cases(db: Session, cases: Optional[List[Case]] = None, details: bool = True) -> List[Dict[str, Any]]:
+    """Per-case summaries used by the system-wide RAG queries.
+
+    Counts and amounts come from case_stats. Parties and timeline events are
+    only included with ``details``, loaded in bulk unless ``cases`` already
+    holds the eager-loaded cases.
+    """
+    totals = stored_case_stats(db)
+    if cases is None:
+        cases = load_all_cases(db) if details else db.query(Case).order_by(Case.case_id).all()
+    summaries = []
+    for case in cases:
+        counts = totals.get(case.case_id, _empty_totals())
+        total_amount = counts["total_amount"]
+        summary = {
+            'case_id': case.case_id,
+            'case_type': case.case_type,
+            'status': case.status,
+            'date_filed': case.date_filed.strftime('%Y-%m-%d') if case.date_filed else 'Unknown',
+            'summary': case.case_summary,
+            'parties_count': counts["parties_count"],
+            'events_count': counts["events_count"],
+            'financials_count': counts["financials_count"],
+            'total_amount': total_amount,
+            'financial_summary': f"${total_amount:,}" if total_amount > 0 else "No financial records"
+        }
+        if details:
+            summary.update({
+                'parties': [{'type': p.party_type, 'name': p.name} for p in case.parties],
+                'recent_events': [e.description for e in case.events[-3:]],
+                'timeline_events': [
+                    {
+                        'date': e.event_date.strftime('%Y-%m-%d') if e.event_date else 'Unknown',
+                        'description': e.description
+                    } for e in case.events
+                ]
+            })
+        summaries.append(summary)
+    return summaries
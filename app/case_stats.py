@@ -0,0 +1,138 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Set
+from sqlalchemy import event, inspect, select, insert, update, delete
+from sqlalchemy.orm import Session
+from .db import SessionLocal
+from .models import Case, Party, TimelineEvent, FinancialRecord, CaseStats, SystemStats
+from .case_context import case_totals
+
+# Materialized statistics for the system endpoints.
+#
+# case_stats holds per-case counts and amounts, system_stats rolls them up
+# per status. Both are maintained incrementally: every flush through
+# SessionLocal recomputes the stats of the cases it touched and applies the
+# difference to the rollup, inside the same transaction.
+
+STAT_FIELDS = ("parties_count", "events_count", "financials_count", "total_amount")
+ROLLUP_FIELDS = ("cases_count",) + STAT_FIELDS
+TRACKED_MODELS = (Case, Party, TimelineEvent, FinancialRecord)
+
+def status_key(status) -> str:
+    """system_stats is keyed by status, which may be NULL on cases"""
+    return status or "Unknown"
+
+def _changed_case_ids(session: Session) -> Set[str]:
+    case_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, TRACKED_MODELS):
+            continue
+        if obj.case_id:
+            case_ids.add(obj.case_id)
+        # Rows moved to another case also change the stats of the old one
+        history = inspect(obj).attrs.case_id.history
+        case_ids.update(value for value in history.deleted if value)
+    return case_ids
+
+@event.listens_for(SessionLocal, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    case_ids = _changed_case_ids(session)
+    if case_ids:
+        refresh_case_stats(session, case_ids)
+
+def refresh_case_stats(session: Session, case_ids: Iterable[str]):
+    """Recompute stats for the given cases and apply the change to the rollup"""
+    case_ids = set(case_ids)
+    conn = session.connection()
+    with session.no_autoflush:
+        previous = {
+            row.case_id: row
+            for row in conn.execute(select(CaseStats).where(CaseStats.case_id.in_(case_ids)))
+        }
+        statuses = dict(conn.execute(
+            select(Case.case_id, Case.status).where(Case.case_id.in_(case_ids))
+        ).all())
+        totals = case_totals(session, case_ids)
+
+    deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    for case_id in case_ids:
+        old = previous.get(case_id)
+        if old is not None:
+            delta = deltas[status_key(old.status)]
+            delta["cases_count"] -= 1
+            for field in STAT_FIELDS:
+                delta[field] -= getattr(old, field) or 0
+        if case_id in statuses:
+            current = totals.get(case_id, {})
+            delta = deltas[status_key(statuses[case_id])]
+            delta["cases_count"] += 1
+            for field in STAT_FIELDS:
+                delta[field] += current.get(field, 0)
+
+    now = datetime.now()
+    conn.execute(delete(CaseStats).where(CaseStats.case_id.in_(case_ids)))
+    rows = [
+        {
+            "case_id": case_id,
+            "status": status,
+            **{field: totals.get(case_id, {}).get(field, 0) for field in STAT_FIELDS},
+            "updated_at": now
+        }
+        for case_id, status in statuses.items()
+    ]
+    if rows:
+        conn.execute(insert(CaseStats), rows)
+    _apply_rollup_deltas(conn, deltas)
+
+def _apply_rollup_deltas(conn, deltas: Dict[str, Dict[str, int]]):
+    changed = {status: delta for status, delta in deltas.items() if any(delta.values())}
+    if not changed:
+        return
+    existing = set(conn.execute(
+        select(SystemStats.status).where(SystemStats.status.in_(list(changed)))
+    ).scalars())
+    for status, delta in changed.items():
+        if status in existing:
+            conn.execute(
+                update(SystemStats)
+                .where(SystemStats.status == status)
+                .values({field: getattr(SystemStats, field) + value for field, value in delta.items()})
+            )
+        else:
+            conn.execute(insert(SystemStats).values(status=status, **delta))
+
+def rebuild_case_stats(session: Session) -> int:
+    """Recompute case_stats and system_stats from scratch; returns the number of cases"""
+    conn = session.connection()
+    with session.no_autoflush:
+        statuses = dict(conn.execute(select(Case.case_id, Case.status)).all())
+        totals = case_totals(session)
+
+    now = datetime.now()
+    rows = []
+    rollup: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    for case_id, status in statuses.items():
+        current = {field: totals.get(case_id, {}).get(field, 0) for field in STAT_FIELDS}
+        rows.append({"case_id": case_id, "status": status, **current, "updated_at": now})
+        entry = rollup[status_key(status)]
+        entry["cases_count"] += 1
+        for field in STAT_FIELDS:
+            entry[field] += current[field]
+
+    conn.execute(delete(CaseStats))
+    conn.execute(delete(SystemStats))
+    if rows:
+        conn.execute(insert(CaseStats), rows)
+    if rollup:
+        conn.execute(insert(SystemStats), [{"status": status, **values} for status, values in rollup.items()])
+    return len(rows)
+
+def ensure_case_stats(session: Session) -> bool:
+    """Build the stats tables if they are empty but cases exist (e.g. after upgrading)"""
+    has_stats = session.query(CaseStats.case_id).first() is not None
+    has_cases = session.query(Case.case_id).first() is not None
+    if has_stats or not has_cases:
+        return False
+    rebuild_case_stats(session)
+    session.commit()
+    return True
@@ -0,0 +1,149 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .models import DocumentChunk, IngestedDocument
+
+def sha256_file(file_path: str) -> str:
+    """Content hash of a document on disk"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def sha256_text(text: str) -> str:
+    """Content hash of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_chunk_id(case_id: str, document_hash: str, offset: int) -> str:
+    """Deterministic chunk ID, also used as the vector store and keyword index key.
+
+    The case is part of the ID so the same file ingested into two cases
+    gets separate rows instead of one case taking over the other's.
+    """
+    return f"{case_id}:{document_hash[:16]}_{offset}"
+
+def document_chunk_ids(db: Session, case_id: str, document_hash: str) -> List[str]:
+    """Chunk IDs of a document fully ingested into a case (empty if it is new or was left incomplete)"""
+    complete = db.query(IngestedDocument.case_id).filter(
+        IngestedDocument.case_id == case_id,
+        IngestedDocument.document_hash == document_hash
+    ).first()
+    if complete is None:
+        return []
+    rows = db.query(DocumentChunk.chunk_id).filter(
+        DocumentChunk.case_id == case_id,
+        DocumentChunk.document_hash == document_hash
+    ).order_by(DocumentChunk.chunk_index).all()
+    return [row.chunk_id for row in rows]
+
+def stored_vector_ids(db: Session, case_id: str, content_hashes: Iterable[str]) -> Dict[str, str]:
+    """Map each of the given contents already embedded for a case to its vector ID"""
+    content_hashes = list(set(content_hashes))
+    if not content_hashes:
+        return {}
+    rows = db.query(DocumentChunk.content_hash, DocumentChunk.vector_id).filter(
+        DocumentChunk.case_id == case_id,
+        DocumentChunk.content_hash.in_(content_hashes)
+    ).all()
+    return {row.content_hash: row.vector_id for row in rows if row.vector_id}
+
+def remove_superseded_chunks(db: Session, case_id: str, document_name: Optional[str], document_hash: str) -> List[str]:
+    """Delete rows of earlier versions of a document; returns the vector IDs they used"""
+    if not document_name:
+        return []
+    stale = db.query(DocumentChunk).filter(
+        DocumentChunk.case_id == case_id,
+        DocumentChunk.document_name == document_name,
+        DocumentChunk.document_hash != document_hash
+    ).all()
+    for row in stale:
+        db.delete(row)
+    db.query(IngestedDocument).filter(
+        IngestedDocument.case_id == case_id,
+        IngestedDocument.document_name == document_name,
+        IngestedDocument.document_hash != document_hash
+    ).delete(synchronize_session=False)
+    return list({row.vector_id for row in stale if row.vector_id})
+
+def mark_document_ingested(db: Session, case_id: str, document_hash: str, document_name: Optional[str], chunks_count: int):
+    """Record that every chunk of a document is stored, so re-ingesting it can be skipped"""
+    db.merge(IngestedDocument(
+        case_id=case_id,
+        document_hash=document_hash,
+        document_name=document_name,
+        chunks_count=chunks_count,
+        ingested_at=datetime.now()
+    ))
+
+def ensure_ingested_documents(db: Session) -> bool:
+    """Mark documents stored before completion was tracked as ingested (e.g. after upgrading)"""
+    has_marks = db.query(IngestedDocument.case_id).first() is not None
+    has_chunks = db.query(DocumentChunk.chunk_id).first() is not None
+    if has_marks or not has_chunks:
+        return False
+    now = datetime.now()
+    rows = db.query(
+        DocumentChunk.case_id,
+        DocumentChunk.document_hash,
+        func.max(DocumentChunk.document_name),
+        func.count(DocumentChunk.chunk_id)
+    ).group_by(DocumentChunk.case_id, DocumentChunk.document_hash).all()
+    for case_id, document_hash, document_name, count in rows:
+        db.add(IngestedDocument(
+            case_id=case_id,
+            document_hash=document_hash,
+            document_name=document_name,
+            chunks_count=count,
+            ingested_at=now
+        ))
+    db.commit()
+    return True
+
+def unreferenced_vector_ids(db: Session, case_id: str, vector_ids: Iterable[str]) -> List[str]:
+    """The given vector IDs that no remaining chunk row points at"""
+    vector_ids = list(set(vector_ids))
+    if not vector_ids:
+        return []
+    referenced = {
+        row.vector_id for row in db.query(DocumentChunk.vector_id).filter(
+            DocumentChunk.case_id == case_id,
+            DocumentChunk.vector_id.in_(vector_ids)
+        ).distinct().all()
+    }
+    return [vector_id for vector_id in vector_ids if vector_id not in referenced]
+
+def load_chunks(db: Session, chunk_ids: Iterable[str]) -> List[DocumentChunk]:
+    """Fetch chunk rows by ID, e.g. to resolve citations in query sources"""
+    chunk_ids = list(chunk_ids)
+    if not chunk_ids:
+        return []
+    return db.query(DocumentChunk).filter(DocumentChunk.chunk_id.in_(chunk_ids)).all()
+
+def record_document_chunks(db: Session, case_id: str, chunks: List):
+    """Persist chunk rows.
+
+    ``chunks`` are pipeline chunks carrying ``id`` and ``text``, with
+    ``document_hash``, ``document_name``, ``chunk_index``, ``content_hash``,
+    ``vector_id`` and their source location in their metadata.
+    """
+    now = datetime.now()
+    for chunk in chunks:
+        db.merge(DocumentChunk(
+            chunk_id=chunk.id,
+            case_id=case_id,
+            document_hash=chunk.metadata.get("document_hash"),
+            document_name=chunk.metadata.get("document_name"),
+            chunk_index=chunk.metadata.get("chunk_index"),
+            content_hash=chunk.metadata.get("content_hash") or sha256_text(chunk.text),
+            vector_id=chunk.metadata.get("vector_id") or chunk.id,
+            page_number=chunk.metadata.get("page_number"),
+            page_end=chunk.metadata.get("page_end"),
+            start_offset=chunk.metadata.get("start_offset"),
+            end_offset=chunk.metadata.get("end_offset"),
+            section_heading=chunk.metadata.get("section_heading") or None,
+            content=chunk.text,
+            created_at=now
+        ))
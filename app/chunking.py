@@ -0,0 +1,159 @@
+import re
+from bisect import bisect_right
+from itertools import takewhile
+from typing import List, NamedTuple, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+LEGAL_SEPARATORS = ["\n\n", "\n", ".", " "]
+
+# Lines treated as section headings: ALL CAPS lines ("ACCIDENT DESCRIPTION"),
+# short title-case numbered headings ("1. Introduction", "2.3 Damages",
+# "IV. Liability", "Section 4 Remedies") and short title-case
+# labels ending in a colon ("Treatment Plan:"). Dates, addresses, dosages,
+# billing codes and "Label: value" lines are not headings.
+_NUMBERED_HEADING = re.compile(
+    r"^(?:\d{1,2}\.(?:\d{1,2}\.?)*|[IVXLC]+\.|(?i:section|article)\s+[\dIVXLC]+\.?)\s+[A-Z]"
+)
+_LABEL_SMALL_WORDS = {"a", "an", "and", "as", "at", "by", "for", "in", "of", "on", "or", "the", "to"}
+
+def _is_title_case(words: List[str]) -> bool:
+    words = [word for word in words if word[0].isalpha()]
+    return bool(words) and words[0][0].isupper() and all(
+        word[0].isupper() or word in _LABEL_SMALL_WORDS for word in words
+    )
+
+def is_section_heading(line: str) -> bool:
+    line = line.strip()
+    if not 3 <= len(line) <= 80:
+        return False
+    # "VIN: 1HGB..." or "Claim No: 123" label a value rather than a section
+    if ":" in line.rstrip(":"):
+        return False
+    words = line.split()
+    letters = [ch for ch in line if ch.isalpha()]
+    if len(letters) >= 3 and all(ch.isupper() for ch in letters):
+        # Mostly letters, so IDs and codes such as "1HGBH41JXMN" don't count
+        return len(letters) >= 0.6 * len(line.replace(" ", ""))
+    if _NUMBERED_HEADING.match(line):
+        # Numbered list items ("2. Please obtain repair estimates") are sentences, not titles
+        return len(words) <= 8 and _is_title_case(words[1:])
+    return line.endswith(":") and len(words) <= 5 and _is_title_case(words)
+
+def make_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=LEGAL_SEPARATORS,
+        add_start_index=True
+    )
+
+class TextChunk(NamedTuple):
+    text: str
+    start_offset: int       # offset in the whole document
+    end_offset: int
+    page_number: int        # 1-based page the chunk starts on
+    page_end: int           # page the chunk ends on
+    page_offset: int        # offset of the chunk start within its page
+    section_heading: str    # closest heading at or before the chunk start ("" if none)
+
+class StreamingChunker:
+    """Chunks document text that arrives one page at a time.
+
+    Only a window of recent text is buffered. Once the buffer exceeds
+    ``window_chars``, every chunk that can no longer be affected by
+    upcoming text is emitted, and the buffer is trimmed to the start of the
+    first pending chunk. Page boundaries and section headings are tracked,
+    so each chunk records where in the original PDF it came from.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, window_chars: int = 0):
+        self.splitter = make_splitter(chunk_size, chunk_overlap)
+        self.chunk_size = chunk_size
+        self.window_chars = window_chars or chunk_size * 8
+        self.buffer = ""
+        self.buffer_offset = 0
+        # (document offset, value) markers, sorted by offset
+        self._page_starts: List[Tuple[int, int]] = []
+        self._headings: List[Tuple[int, str]] = []
+
+    def feed(self, text: str, page_number: Optional[int] = None) -> List[TextChunk]:
+        """Add a page of text; returns the chunks that are now final"""
+        start = self.buffer_offset + len(self.buffer)
+        page_number = page_number or (self._page_starts[-1][1] + 1 if self._page_starts else 1)
+        self._page_starts.append((start, page_number))
+        position = 0
+        for line in text.splitlines(keepends=True):
+            if is_section_heading(line):
+                self._headings.append((start + position + len(line) - len(line.lstrip()), line.strip()))
+            position += len(line)
+
+        self.buffer += text
+        if len(self.buffer) < self.window_chars:
+            return []
+        return self._drain(final=False)
+
+    def flush(self) -> List[TextChunk]:
+        """Emit everything that is left at the end of the document"""
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> List[TextChunk]:
+        docs = self.splitter.create_documents([self.buffer])
+        if final:
+            ready = docs
+            keep_from = len(self.buffer)
+        else:
+            # A chunk ending close to the buffer end could still grow with the next page
+            safe_end = len(self.buffer) - self.chunk_size
+            ready = list(takewhile(
+                lambda doc: doc.metadata["start_index"] + len(doc.page_content) <= safe_end, docs
+            ))
+            if not ready:
+                return []
+            if len(ready) < len(docs):
+                keep_from = docs[len(ready)].metadata["start_index"]
+            else:
+                last = ready[-1]
+                keep_from = last.metadata["start_index"] + len(last.page_content)
+
+        chunks = [self._locate(doc.page_content, self.buffer_offset + doc.metadata["start_index"]) for doc in ready]
+        self.buffer = self.buffer[keep_from:]
+        self.buffer_offset += keep_from
+        self._prune()
+        return chunks
+
+    def _locate(self, text: str, start: int) -> TextChunk:
+        end = start + len(text)
+        page_offsets = [offset for offset, _ in self._page_starts]
+        page_index = max(bisect_right(page_offsets, start) - 1, 0)
+        end_index = max(bisect_right(page_offsets, max(end - 1, start)) - 1, 0)
+        page_start, page_number = self._page_starts[page_index]
+        heading_index = bisect_right([offset for offset, _ in self._headings], start) - 1
+        return TextChunk(
+            text=text,
+            start_offset=start,
+            end_offset=end,
+            page_number=page_number,
+            page_end=self._page_starts[end_index][1],
+            page_offset=start - page_start,
+            section_heading=self._headings[heading_index][1] if heading_index >= 0 else ""
+        )
+
+    def _prune(self):
+        # Keep the last marker before the buffer start; it still applies to buffered text
+        self._page_starts = self._trim(self._page_starts)
+        self._headings = self._trim(self._headings)
+
+    def _trim(self, markers: List[Tuple[int, object]]) -> List[Tuple[int, object]]:
+        first = 0
+        while first + 1 < len(markers) and markers[first + 1][0] <= self.buffer_offset:
+            first += 1
+        return markers[first:]
+
+def chunk_pages(pages: List[str], chunk_size: int, chunk_overlap: int) -> List[TextChunk]:
+    """Chunk a fully extracted document, one entry per page"""
+    chunker = StreamingChunker(chunk_size, chunk_overlap)
+    chunks: List[TextChunk] = []
+    for page_number, page_text in enumerate(pages, start=1):
+        chunks.extend(chunker.feed(page_text + "\n", page_number))
+    chunks.extend(chunker.flush())
+    return chunks
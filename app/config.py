@@ -11,6 +11,11 @@ class LLMProvider(str, Enum):
     OLLAMA = "ollama"
     OPENAI = "openai"
 
+class EmbeddingBackend(str, Enum):
+    SENTENCE_TRANSFORMERS = "sentence_transformers"
+    ONNX = "onnx"
+    ONNX_INT8 = "onnx_int8"
+
 class LLMConfig(BaseModel):
     provider: LLMProvider = LLMProvider.OLLAMA
     model: str = "mistral"  # Default Ollama model
@@ -28,15 +33,97 @@ class AppConfig:
             temperature=float(os.getenv("LLM_TEMPERATURE", "0.0"))
         )
         
+        # LLM execution settings
+        self.llm_max_workers = int(os.getenv("LLM_MAX_WORKERS", "8"))
+        self.llm_concurrency = {
+            LLMProvider.OLLAMA: int(os.getenv("LLM_CONCURRENCY_OLLAMA", "2")),
+            LLMProvider.OPENAI: int(os.getenv("LLM_CONCURRENCY_OPENAI", "8"))
+        }
+        # Concurrent LLM generations for one batched multi-query request
+        self.rag_query_concurrency = int(os.getenv("RAG_QUERY_CONCURRENCY", "4"))
+        
+        # Retrieval settings
+        self.rag_top_k = int(os.getenv("RAG_TOP_K", "5"))
+        # Fuse BM25 keyword hits with vector hits (reciprocal-rank fusion)
+        self.hybrid_retrieval = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+        # Candidates taken from each index before fusion
+        self.rag_candidate_k = int(os.getenv("RAG_CANDIDATE_K", "20"))
+        self.rrf_k = int(os.getenv("RRF_K", "60"))
+        # Number of per-case keyword indexes kept in memory
+        self.keyword_index_cache_size = int(os.getenv("KEYWORD_INDEX_CACHE_SIZE", "32"))
+        
+        # Answer cache settings (size 0 disables the cache)
+        self.answer_cache_size = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+        self.answer_cache_ttl = float(os.getenv("ANSWER_CACHE_TTL", "900"))
+        # Cosine similarity at which a reworded query reuses a cached answer (0 = exact matches only)
+        self.answer_cache_similarity = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+        
         # ChromaDB settings
         self.chroma_dir = os.getenv("CHROMA_DIR", "rag_store")
         self.pdf_dir = os.getenv("PDF_DIR", "sample_docs")
+        # Number of per-case vector store handles kept open
+        self.chroma_cache_size = int(os.getenv("CHROMA_CACHE_SIZE", "32"))
+        # "per_case" (one store per case) or "sharded" (shared collections filtered by case_id)
+        self.vector_store_mode = os.getenv("VECTOR_STORE_MODE", "per_case")
+        self.vector_store_shards = int(os.getenv("VECTOR_STORE_SHARDS", "1"))
         
         # Embeddings settings
         self.embedding_model = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        # sentence_transformers (PyTorch), onnx, or onnx_int8 (dynamically quantized ONNX)
+        self.embedding_backend = EmbeddingBackend(os.getenv("EMBEDDING_BACKEND", "sentence_transformers"))
+        # ONNX file within the model repository (defaults to onnx/model.onnx)
+        self.embedding_onnx_file = os.getenv("EMBEDDING_ONNX_FILE", "")
+        # Seconds a loaded embedding model may sit unused before it is released (0 = never)
+        self.embedding_idle_timeout = float(os.getenv("EMBEDDING_IDLE_TIMEOUT", "0"))
+        # Texts per model forward pass, and torch intra-op threads (0 = torch default)
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.embedding_num_threads = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))
+        # Unit-normalize vectors; changing this requires re-ingesting existing stores
+        self.embedding_normalize = os.getenv("EMBEDDING_NORMALIZE", "false").lower() == "true"
+        # Embeddings kept in memory, keyed by content hash (0 disables the cache)
+        self.embedding_cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+        # Directory embeddings are spilled to on disk (empty = memory only)
+        self.embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(self.chroma_dir, "_embedding_cache"))
+        
+        # Folder ingestion settings
+        self.ingest_extract_workers = int(os.getenv("INGEST_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+        self.ingest_llm_concurrency = int(os.getenv("INGEST_LLM_CONCURRENCY", "4"))
+        self.ingest_embed_batch_size = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+        # Documents with at least this many pages are extracted and chunked as a page stream
+        self.stream_extract_min_pages = int(os.getenv("STREAM_EXTRACT_MIN_PAGES", "50"))
+        self.stream_extract_pages_per_task = int(os.getenv("STREAM_EXTRACT_PAGES_PER_TASK", "25"))
+        self.stream_extract_max_in_flight = int(os.getenv("STREAM_EXTRACT_MAX_IN_FLIGHT", "4"))
+        
+        # Uploaded documents are copied to disk in chunks of UPLOAD_CHUNK_SIZE bytes
+        self.upload_max_mb = int(os.getenv("UPLOAD_MAX_MB", "100"))
+        self.upload_chunk_size = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+        # Directory uploads are staged in while processed (empty = system temp dir)
+        self.upload_dir = os.getenv("UPLOAD_DIR", "")
+        
+        # Background ingestion jobs run concurrently per API process
+        self.job_workers = int(os.getenv("JOB_WORKERS", "2"))
+        # SQLite file job records are kept in (empty = memory only, lost on restart)
+        self.job_store_path = os.getenv("JOB_STORE_PATH", "")
+        
+        # Cases a batch demand letter request works on at once, and processes rendering their PDFs
+        self.batch_letter_concurrency = int(os.getenv("BATCH_LETTER_CONCURRENCY", "4"))
+        self.pdf_render_workers = int(os.getenv("PDF_RENDER_WORKERS", str(os.cpu_count() or 2)))
+        
+        # Create the RAG engines and load the embedding model in the background at startup
+        self.engine_warmup = os.getenv("ENGINE_WARMUP", "true").lower() == "true"
         
         # Database settings
         self.database_url = os.getenv("DATABASE_URL", "postgresql://lakshmana@localhost:5432/legal_db")
+        # Connections kept per worker process, and extra ones allowed under load
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        # Seconds to wait for a free connection before failing
+        self.db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # Seconds after which a connection is replaced (-1 = never)
+        self.db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.db_pool_pre_ping = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        # Per-statement timeout in milliseconds, PostgreSQL only (0 = none)
+        self.db_statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
 
 # Global configuration instance
 config = AppConfig() 
\ No newline at end of file
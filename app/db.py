@@ -1,14 +1,79 @@
-from sqlalchemy import create_engine
+import threading
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from .config import config
 
-# Use local PostgreSQL installation
-DATABASE_URL = "postgresql://lakshmana@localhost:5432/legal_db"
+DATABASE_URL = config.database_url
 
-engine = create_engine(DATABASE_URL)
+def _engine_options(url: str) -> Dict[str, Any]:
+    """Pool and connection settings from AppConfig"""
+    options: Dict[str, Any] = {
+        "pool_pre_ping": config.db_pool_pre_ping,
+        "pool_recycle": config.db_pool_recycle,
+    }
+    if url.startswith("sqlite"):
+        return options
+    options.update(
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+    )
+    if url.startswith("postgresql") and config.db_statement_timeout_ms:
+        # Applied per connection, so a runaway query can't hold a pooled connection forever
+        options["connect_args"] = {"options": f"-c statement_timeout={config.db_statement_timeout_ms}"}
+    return options
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
+class PoolCounters:
+    """Cumulative connection pool events, for the pool metrics endpoint"""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(("connects", "checkouts", "checkins", "invalidations"), 0)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+pool_counters = PoolCounters()
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_counters.increment("connects")
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_counters.increment("checkouts")
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_counters.increment("checkins")
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_counters.increment("invalidations")
+
+def pool_metrics() -> Dict[str, Any]:
+    """Current pool occupancy and cumulative event counts"""
+    pool = engine.pool
+    metrics: Dict[str, Any] = {"pool_class": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        gauge = getattr(pool, name, None)
+        if callable(gauge):
+            metrics[name] = gauge()
+    metrics["max_overflow"] = getattr(pool, "_max_overflow", None)
+    metrics.update(pool_counters.snapshot())
+    return metrics
+
 def get_db():
     db = SessionLocal()
     try:
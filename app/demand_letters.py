@@ -0,0 +1,181 @@
+import asyncio
+import json
+import time
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from .config import config
+from .engines import aget_rag_engine
+from .models import Case
+from .pdf_render import render_demand_letter_pdf, demand_letter_filename, get_render_pool
+
+# Demand letter drafting, for one case or a batch of cases.
+#
+# A batch works on cases that were bulk-loaded up front: up to
+# BATCH_LETTER_CONCURRENCY cases run their RAG sub-queries at once (the
+# LLM calls are further bounded per provider by the shared executor), and
+# PDFs are rendered on a process pool so rendering scales with cores.
+
+async def generate_letter_content(case, parties, events, financials, rag_results, template_type):
+    """Generate letter content using RAG results and case data"""
+    # Extract key information from RAG results
+    medical_info = rag_results.get("Summarize medical expenses and treatment details", "")
+    lost_wages_info = rag_results.get("Calculate lost wages and income impact", "")
+    pain_suffering_info = rag_results.get("Assess pain and suffering factors", "")
+    liability_info = rag_results.get("Identify liability and negligence evidence", "")
+
+    # Calculate totals from financial records
+    medical_total = sum(f.amount for f in financials if f.record_type == "medical")
+    lost_wages_total = sum(f.amount for f in financials if f.record_type == "lost_wages")
+    pain_suffering_total = sum(f.amount for f in financials if f.record_type == "pain_suffering")
+
+    # Find defendant and client
+    defendant = next((p for p in parties if p.party_type == "defendant"), None)
+    client = next((p for p in parties if p.party_type == "plaintiff"), None)
+
+    # Generate letter content
+    letter_content = f"""
+[LAW FIRM LETTERHEAD]
+{datetime.now().strftime('%B %d, %Y')}
+
+{defendant.name if defendant else 'Defendant'}
+Attn: Claims Department
+
+Re: Demand for ${medical_total + lost_wages_total + pain_suffering_total:,} – Case {case.case_id}
+
+Dear Sir or Madam:
+
+On behalf of our client, {client.name if client else 'our client'}, we demand payment of ${medical_total + lost_wages_total + pain_suffering_total:,} for injuries sustained due to your insured's negligence.
+
+BASED ON OUR ANALYSIS OF THE CASE DOCUMENTS:
+
+{medical_info}
+
+{lost_wages_info}
+
+{pain_suffering_info}
+
+LIABILITY EVIDENCE:
+{liability_info}
+
+DETAILED BREAKDOWN:
+1. Medical Expenses: ${medical_total:,}
+2. Lost Wages: ${lost_wages_total:,}
+3. Pain & Suffering: ${pain_suffering_total:,}
+TOTAL DEMAND: ${medical_total + lost_wages_total + pain_suffering_total:,}
+
+Please remit payment within 30 days of this letter.
+
+Sincerely,
+
+[Attorney Name]
+    """
+
+    return letter_content.strip()
+
+async def draft_letter(case: Case, template_type: str, additional_context: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer the demand letter sub-queries for an eager-loaded case and draft the letter"""
+    from .rag_pipeline import DEMAND_LETTER_QUERIES  # deferred: heavy import
+    rag_engine = await aget_rag_engine()
+    responses = await rag_engine.query_many(DEMAND_LETTER_QUERIES, case.case_id, additional_context, case=case)
+    rag_results = {query: response.answer for query, response in responses.items()}
+    letter_content = await generate_letter_content(
+        case, case.parties, case.events, case.financials, rag_results, template_type
+    )
+    return {"letter_content": letter_content, "rag_context": rag_results}
+
+async def render_pdf(letter_content: str) -> bytes:
+    """Render a letter on the shared render process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_pool(), render_demand_letter_pdf, letter_content)
+
+async def generate_letters(
+    cases: List[Case],
+    template_type: str = "demand_letter",
+    additional_context: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Draft and render letters for many cases, yielding each outcome as it completes.
+
+    Outcomes carry ``case_id``, ``letter_content``, ``rag_context``, ``pdf``
+    (bytes), ``seconds`` and ``error`` (set instead of the letter on failure).
+    """
+    slots = asyncio.Semaphore(concurrency or config.batch_letter_concurrency)
+
+    async def one(case: Case) -> Dict[str, Any]:
+        async with slots:
+            started = time.perf_counter()
+            outcome = {"case_id": case.case_id, "letter_content": None, "rag_context": None, "pdf": None, "error": None}
+            try:
+                outcome.update(await draft_letter(case, template_type, additional_context or {}))
+                outcome["pdf"] = await render_pdf(outcome["letter_content"])
+            except Exception as e:
+                outcome["error"] = str(e)
+            outcome["seconds"] = round(time.perf_counter() - started, 3)
+            return outcome
+
+    tasks = [asyncio.create_task(one(case)) for case in cases]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer may stop early (e.g. the client disconnected)
+        for task in tasks:
+            task.cancel()
+
+class _ZipSink:
+    """Write-only file object that collects ZipFile output for streaming"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def stream_letters_zip(
+    cases: List[Case],
+    missing_case_ids: List[str],
+    template_type: str = "demand_letter",
+    additional_context: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[bytes]:
+    """Zip archive of letter PDFs, streamed as each case finishes.
+
+    The archive ends with ``manifest.json`` listing every requested case
+    with its PDF file name or error.
+    """
+    sink = _ZipSink()
+    manifest = [{"case_id": case_id, "file_name": None, "error": "Case not found"} for case_id in missing_case_ids]
+    # PDFs are already compressed, so they are stored as-is
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        async for outcome in generate_letters(cases, template_type, additional_context):
+            entry = {"case_id": outcome["case_id"], "file_name": None, "error": outcome["error"], "seconds": outcome["seconds"]}
+            if outcome["pdf"] is not None:
+                entry["file_name"] = demand_letter_filename(outcome["case_id"])
+                archive.writestr(entry["file_name"], outcome["pdf"])
+                print(f"📄 Demand letter ready for case {outcome['case_id']} ({outcome['seconds']:.1f}s)")
+            else:
+                print(f"❌ Demand letter failed for case {outcome['case_id']}: {outcome['error']}")
+            manifest.append(entry)
+            yield sink.drain()
+        manifest.sort(key=lambda entry: entry["case_id"])
+        archive.writestr("manifest.json", json.dumps({"generated_at": datetime.now().isoformat(), "cases": manifest}, indent=2))
+    yield sink.drain()
+
+async def run_letter_job(job, case: Case, template_type: str, additional_context: Dict[str, Any]) -> Dict[str, Any]:
+    """Background job drafting one case's letter; the PDF is rendered on request from the stored text"""
+    draft = await draft_letter(case, template_type, additional_context)
+    return {
+        "case_id": case.case_id,
+        "template_type": template_type,
+        "file_name": demand_letter_filename(case.case_id),
+        **draft
+    }
@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .config import config, EmbeddingBackend
+
+class SentenceTransformerBackend(Embeddings):
+    """Batched sentence-transformers embeddings returned as NumPy arrays.
+
+    Texts are encoded in fixed-size batches of ``batch_size`` and the result
+    is a C-contiguous float32 matrix that can be handed to the vector store
+    as-is. ``num_threads`` caps the intra-op threads used by torch (0 leaves
+    the torch default); note that this setting is process-wide.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: Optional[int] = None,
+        num_threads: Optional[int] = None,
+        normalize: Optional[bool] = None
+    ):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size or config.embedding_batch_size
+        self.num_threads = config.embedding_num_threads if num_threads is None else num_threads
+        self.normalize = config.embedding_normalize if normalize is None else normalize
+        if self.num_threads:
+            import torch
+            torch.set_num_threads(self.num_threads)
+        self.model = SentenceTransformer(model_name)
+        # The model is not safe for concurrent encode calls from several threads
+        self._lock = threading.Lock()
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dimension) float32 matrix"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        texts = [text.replace("\n", " ") for text in texts]
+        with self._lock:
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize,
+                show_progress_bar=False
+            )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+class OnnxEmbeddingBackend(Embeddings):
+    """CPU embeddings from an ONNX export of a sentence-transformers model.
+
+    Runs on onnxruntime with the model's own tokenizer, pooling and
+    normalization settings, so vectors stay compatible with the PyTorch
+    backend while avoiding the torch import. With ``quantize`` the export is
+    dynamically quantized to int8 weights once and the quantized file is
+    reused afterwards.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        quantize: bool = False,
+        onnx_file: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        num_threads: Optional[int] = None,
+        normalize: Optional[bool] = None
+    ):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backends require onnxruntime and tokenizers "
+                "(pip install onnxruntime tokenizers huggingface_hub)"
+            ) from e
+
+        self.model_name = model_name
+        self.batch_size = batch_size or config.embedding_batch_size
+        onnx_file = onnx_file or config.embedding_onnx_file or os.path.join("onnx", "model.onnx")
+        model_dir = self._model_dir(model_name, onnx_file)
+
+        modules = self._read_json(model_dir, "modules.json") or []
+        pooling = self._read_json(model_dir, os.path.join("1_Pooling", "config.json")) or {}
+        st_config = self._read_json(model_dir, "sentence_bert_config.json") or {}
+        self.cls_pooling = bool(pooling.get("pooling_mode_cls_token"))
+        model_normalizes = any(module.get("type", "").endswith("Normalize") for module in modules)
+        self.normalize = model_normalizes or (config.embedding_normalize if normalize is None else normalize)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=st_config.get("max_seq_length", 512))
+        if self.tokenizer.padding is None:
+            self.tokenizer.enable_padding()
+
+        onnx_path = os.path.join(model_dir, onnx_file)
+        if quantize:
+            onnx_path = self._quantized(onnx_path)
+        options = onnxruntime.SessionOptions()
+        threads = config.embedding_num_threads if num_threads is None else num_threads
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        output_names = [output.name for output in self.session.get_outputs()]
+        self.output_name = "last_hidden_state" if "last_hidden_state" in output_names else output_names[0]
+        self.dimension = (self._read_json(model_dir, "config.json") or {}).get("hidden_size")
+
+    @staticmethod
+    def _model_dir(model_name: str, onnx_file: str) -> str:
+        if os.path.isdir(model_name):
+            return model_name
+        from huggingface_hub import snapshot_download
+        return snapshot_download(model_name, allow_patterns=[
+            onnx_file, "tokenizer.json", "config.json", "modules.json",
+            "sentence_bert_config.json", "1_Pooling/config.json"
+        ])
+
+    @staticmethod
+    def _read_json(model_dir: str, name: str) -> Optional[Dict]:
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _quantized(onnx_path: str) -> str:
+        """Path of an int8 copy of the model, created on first use"""
+        quantized_path = onnx_path[:-len(".onnx")] + "_int8.onnx"
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            tmp_path = quantized_path + ".tmp"
+            quantize_dynamic(onnx_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+        return quantized_path
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask
+        }
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run([self.output_name], feeds)[0]
+
+        if self.cls_pooling:
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dimension) float32 matrix"""
+        if not texts:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        texts = [text.replace("\n", " ") for text in texts]
+        batches = [
+            self._encode_batch(texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        return np.ascontiguousarray(np.concatenate(batches), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+def embed_array(embeddings: Embeddings, texts: List[str]) -> np.ndarray:
+    """Embed texts as a float32 matrix with any LangChain embeddings object"""
+    if hasattr(embeddings, "embed_array"):
+        return embeddings.embed_array(texts)
+    return np.ascontiguousarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+def create_embedding_backend(
+    model_name: str,
+    backend: Optional[EmbeddingBackend] = None,
+    num_threads: Optional[int] = None
+) -> Embeddings:
+    """Load the embedding model for ``model_name`` with the configured backend.
+
+    ``num_threads`` overrides EMBEDDING_NUM_THREADS.
+    """
+    backend = backend or config.embedding_backend
+    if backend == EmbeddingBackend.SENTENCE_TRANSFORMERS:
+        return SentenceTransformerBackend(model_name, num_threads=num_threads)
+    elif backend == EmbeddingBackend.ONNX:
+        return OnnxEmbeddingBackend(model_name, num_threads=num_threads)
+    elif backend == EmbeddingBackend.ONNX_INT8:
+        return OnnxEmbeddingBackend(model_name, quantize=True, num_threads=num_threads)
+    else:
+        raise ValueError(f"Unsupported embedding backend: {backend}")
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .config import config, EmbeddingBackend
+from .embedding_backend import embed_array
+
+try:
+    import fcntl
+except ImportError:  # Windows: spill files are only locked within the process
+    fcntl = None
+
+def content_key(text: str, kind: str = "document") -> str:
+    """Cache key for a text; queries and documents are keyed separately"""
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingSpill:
+    """Append-only on-disk store of embeddings keyed by content hash.
+
+    Vectors are float32 rows in ``vectors.f32``, read through a memory map;
+    ``index.txt`` maps each content hash to its row. Rows are written before
+    their index line, so the index never points at missing data, and other
+    processes' additions are picked up when the index grows.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.txt")
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._index_position = 0
+        self._matrix: Optional[np.memmap] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _refresh(self):
+        """Read index lines appended since the last refresh"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path) as f:
+            f.seek(self._index_position)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partially written line
+                content_hash, row, dim = line.split()
+                self._rows[content_hash] = int(row)
+                self.dim = int(dim)
+                self._index_position += len(line)
+        self._matrix = None
+
+    def _map(self) -> Optional[np.memmap]:
+        if self._matrix is None and self.dim and os.path.getsize(self.vectors_path):
+            rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._matrix
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(hashes)
+        if any(content_hash not in self._rows for content_hash in hashes):
+            self._refresh()
+        found = {}
+        matrix = self._map()
+        for content_hash in hashes:
+            row = self._rows.get(content_hash)
+            if row is not None and matrix is not None and row < matrix.shape[0]:
+                found[content_hash] = np.array(matrix[row])
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        if not vectors:
+            return
+        with open(self.index_path, "a") as index_file:
+            if fcntl is not None:
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new = {h: v for h, v in vectors.items() if h not in self._rows}
+                if not new:
+                    return
+                dim = len(next(iter(new.values())))
+                if self.dim is not None and dim != self.dim:
+                    return  # a different model's vectors; never mix dimensions
+                with open(self.vectors_path, "ab") as vectors_file:
+                    start = vectors_file.tell() // (dim * 4)
+                    vectors_file.write(np.asarray(list(new.values()), dtype=np.float32).tobytes())
+                lines = [f"{content_hash} {start + i} {dim}\n" for i, content_hash in enumerate(new)]
+                index_file.write("".join(lines))
+                index_file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(index_file, fcntl.LOCK_UN)
+
+class EmbeddingCache:
+    """Content-hash keyed embedding cache: an in-memory LRU in front of an optional spill"""
+
+    def __init__(self, capacity: int, directory: Optional[str] = None):
+        self.capacity = capacity
+        self.spill = EmbeddingSpill(directory) if directory else None
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for content_hash in hashes:
+                vector = self._vectors.get(content_hash)
+                if vector is not None:
+                    self._vectors.move_to_end(content_hash)
+                    found[content_hash] = vector
+            missing = [content_hash for content_hash in hashes if content_hash not in found]
+            if missing and self.spill is not None:
+                spilled = self.spill.get_many(missing)
+                self._remember(spilled)
+                found.update(spilled)
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        with self._lock:
+            self._remember(vectors)
+            if self.spill is not None:
+                self.spill.put_many(vectors)
+
+    def _remember(self, vectors: Dict[str, np.ndarray]):
+        # Called with the lock held
+        for content_hash, vector in vectors.items():
+            self._vectors[content_hash] = vector
+            self._vectors.move_to_end(content_hash)
+        while len(self._vectors) > self.capacity:
+            self._vectors.popitem(last=False)
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that consult the cache before running the model.
+
+    The model is fetched from the embedding registry only on a cache miss,
+    so fully cached requests never load it.
+    """
+
+    def __init__(self, model_name: str, cache: EmbeddingCache, load_model):
+        self.model_name = model_name
+        self.cache = cache
+        self._load_model = load_model
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a float32 matrix, computing only the cache misses"""
+        hashes = [content_key(text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(hashes)))
+        missing = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+        if missing:
+            computed = embed_array(self._load_model(self.model_name), list(missing.values()))
+            new = dict(zip(missing, computed))
+            self.cache.put_many(new)
+            vectors.update(new)
+        if not hashes:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[h] for h in hashes]).astype(np.float32, copy=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        content_hash = content_key(text, "query")
+        vector = self.cache.get_many([content_hash]).get(content_hash)
+        if vector is None:
+            vector = embed_array(self._load_model(self.model_name), [text])[0]
+            self.cache.put_many({content_hash: vector})
+        return vector.tolist()
+
+def embedding_cache_dir(model_name: str) -> Optional[str]:
+    """Spill directory for a model, or None when spilling is disabled"""
+    if not config.embedding_cache_dir:
+        return None
+    # Backends (including int8 quantization), ONNX exports and normalization
+    # all change the vectors, so each combination keeps its own spill
+    parts = [model_name.replace('/', '__'), config.embedding_backend.value]
+    if config.embedding_backend != EmbeddingBackend.SENTENCE_TRANSFORMERS and config.embedding_onnx_file:
+        parts.append(hashlib.sha256(config.embedding_onnx_file.encode("utf-8")).hexdigest()[:12])
+    if config.embedding_normalize:
+        parts.append("normalized")
+    return os.path.join(config.embedding_cache_dir, "__".join(parts))
@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from .config import config
+from .embedding_backend import create_embedding_backend, embed_array
+from .embedding_cache import CachedEmbeddings, EmbeddingCache, embedding_cache_dir
+
+class EmbeddingRegistry:
+    """Process-wide registry of loaded embedding models.
+
+    Each model is loaded once and shared by every document processor and RAG
+    engine in the process. Models that have not been used for
+    ``idle_timeout`` seconds are released again (0 disables unloading).
+    """
+
+    def __init__(self, idle_timeout: float = 0):
+        self.idle_timeout = idle_timeout
+        self._models: Dict[str, Embeddings] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def get(self, model_name: Optional[str] = None) -> Embeddings:
+        """Return the shared embeddings for a model, loading it on first use"""
+        model_name = model_name or config.embedding_model
+        with self._lock:
+            embeddings = self._models.get(model_name)
+            if embeddings is None:
+                embeddings = create_embedding_backend(model_name)
+                self._models[model_name] = embeddings
+            self._last_used[model_name] = time.monotonic()
+            self._start_reaper()
+            return embeddings
+
+    def unload(self, model_name: str) -> bool:
+        """Drop a loaded model; returns True if it was loaded"""
+        with self._lock:
+            self._last_used.pop(model_name, None)
+            return self._models.pop(model_name, None) is not None
+
+    def unload_idle(self) -> int:
+        """Unload every model idle for longer than the timeout"""
+        if not self.idle_timeout:
+            return 0
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [name for name, used in self._last_used.items() if used < cutoff]
+            for name in idle:
+                self._models.pop(name, None)
+                self._last_used.pop(name, None)
+        return len(idle)
+
+    def loaded_models(self) -> Dict[str, float]:
+        """Seconds since last use for every loaded model"""
+        now = time.monotonic()
+        with self._lock:
+            return {name: now - used for name, used in self._last_used.items()}
+
+    def _start_reaper(self):
+        # Called with the lock held
+        if not self.idle_timeout or (self._reaper and self._reaper.is_alive()):
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name="embedding-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 2)
+        while True:
+            time.sleep(interval)
+            self.unload_idle()
+            with self._lock:
+                if not self._models:
+                    self._reaper = None
+                    return
+
+# Global registry instance
+embedding_registry = EmbeddingRegistry(idle_timeout=config.embedding_idle_timeout)
+
+class RegistryEmbeddings(Embeddings):
+    """Embeddings that look the model up in the registry on every call.
+
+    Callers hold this proxy rather than the model, so an idle model that the
+    registry unloads is really freed and reloaded once on next use.
+    """
+
+    def __init__(self, model_name: str, registry: EmbeddingRegistry):
+        self.model_name = model_name
+        self.registry = registry
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        return embed_array(self.registry.get(self.model_name), texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.registry.get(self.model_name).embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.registry.get(self.model_name).embed_query(text)
+
+_cached_embeddings: Dict[str, Embeddings] = {}
+_cached_embeddings_lock = threading.Lock()
+
+def get_embeddings(model_name: Optional[str] = None) -> Embeddings:
+    """Get the shared embeddings instance for a model (defaults to config.embedding_model).
+
+    Unless the embedding cache is disabled, the model sits behind a
+    content-hash keyed cache shared by every processor and engine. Either
+    way the model itself is resolved through the registry on each call.
+    """
+    model_name = model_name or config.embedding_model
+    with _cached_embeddings_lock:
+        embeddings = _cached_embeddings.get(model_name)
+        if embeddings is None:
+            if config.embedding_cache_size <= 0:
+                embeddings = RegistryEmbeddings(model_name, embedding_registry)
+            else:
+                cache = EmbeddingCache(config.embedding_cache_size, embedding_cache_dir(model_name))
+                embeddings = CachedEmbeddings(model_name, cache, embedding_registry.get)
+            _cached_embeddings[model_name] = embeddings
+        return embeddings
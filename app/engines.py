@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+from .config import config
+
+# Shared RAG engine and document processor.
+#
+# Importing the RAG pipeline pulls in LangChain, PyMuPDF and the embedding
+# stack, and creating the engines builds LLM clients, so none of it happens
+# at import time. The engines are created on first use, or ahead of time by
+# a background warm-up started when the API boots. Async code uses the
+# ``aget_*`` variants, which wait for creation off the event loop.
+
+COLD = "cold"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+class EngineWarmup:
+    """Creates the default engines once and reports warm-up progress"""
+
+    def __init__(self):
+        self.state = COLD
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self._rag_engine = None
+        self._doc_processor = None
+        # Engine creation can take a while; state reads must not wait for it
+        self._create_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _timed(self, step: str, fn):
+        start = time.monotonic()
+        result = fn()
+        self.steps[step] = round(time.monotonic() - start, 3)
+        return result
+
+    def rag_engine(self):
+        with self._create_lock:
+            if self._rag_engine is None:
+                from .rag_pipeline import LegalRAGEngine
+                self._rag_engine = self._timed("rag_engine", LegalRAGEngine)
+            return self._rag_engine
+
+    def doc_processor(self):
+        with self._create_lock:
+            if self._doc_processor is None:
+                from .rag_pipeline import LegalDocumentProcessor
+                self._doc_processor = self._timed("doc_processor", LegalDocumentProcessor)
+            return self._doc_processor
+
+    def warm_up(self):
+        """Create the engines and load the embedding model"""
+        with self._lock:
+            if self.state in (WARMING, READY):
+                return
+            self.state = WARMING
+            self.error = None
+            self.started_at = time.monotonic()
+        try:
+            self.rag_engine()
+            self.doc_processor()
+            # A first embedding loads the model weights; it goes to the model
+            # itself, since the embedding cache would answer it from disk
+            from .embeddings import embedding_registry
+            self._timed("embedding_model", lambda: embedding_registry.get(config.embedding_model).embed_query("warm-up"))
+            with self._lock:
+                self.state = READY
+                self.ready_at = time.monotonic()
+            print(f"✅ RAG engines ready in {self.ready_at - self.started_at:.1f}s")
+        except Exception as e:
+            with self._lock:
+                self.state = FAILED
+                self.error = str(e)
+            print(f"❌ RAG engine warm-up failed: {e}")
+
+    def start_background(self):
+        """Warm up in a daemon thread so the API can serve requests meanwhile"""
+        with self._lock:
+            if self.state != COLD or (self._thread and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self.warm_up, name="engine-warmup", daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = round((self.ready_at or time.monotonic()) - self.started_at, 3)
+            return {
+                "state": self.state,
+                # Without warm-up the engines are built by the first request that needs them
+                "ready": self.state == READY or (not config.engine_warmup and self.state != FAILED),
+                "warmup_enabled": config.engine_warmup,
+                "error": self.error,
+                "elapsed_seconds": elapsed,
+                "steps": dict(self.steps),
+                "rag_engine_loaded": self._rag_engine is not None,
+                "doc_processor_loaded": self._doc_processor is not None
+            }
+
+# Global warm-up instance
+engine_warmup = EngineWarmup()
+
+def get_rag_engine():
+    """The shared default-configuration RAG engine, created on first use"""
+    return engine_warmup.rag_engine()
+
+def get_doc_processor():
+    """The shared default-configuration document processor, created on first use"""
+    return engine_warmup.doc_processor()
+
+async def aget_rag_engine():
+    """get_rag_engine for async callers; never blocks the event loop on a warm-up in progress"""
+    if engine_warmup._rag_engine is not None:
+        return engine_warmup._rag_engine
+    return await asyncio.to_thread(get_rag_engine)
+
+async def aget_doc_processor():
+    """get_doc_processor for async callers"""
+    if engine_warmup._doc_processor is not None:
+        return engine_warmup._doc_processor
+    return await asyncio.to_thread(get_doc_processor)
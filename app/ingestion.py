@@ -0,0 +1,216 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+from .config import config
+from .pdf_extract import extract_pdf_pages, get_extract_pool, pdf_page_count
+from .chunk_store import sha256_file
+from .keyword_index import keyword_index_store
+from .rag_pipeline import LegalDocumentProcessor, CaseDocument, DocumentChunk
+
+def list_pdf_files(folder_path: str) -> List[str]:
+    """Find all PDF files in a folder"""
+    return sorted(
+        os.path.join(folder_path, name)
+        for name in os.listdir(folder_path)
+        if name.lower().endswith('.pdf')
+    )
+
+def split_folder_outcomes(outcomes: List[Dict[str, Any]], provider: str, model: str):
+    """Turn pipeline outcomes into the per-file results and errors lists"""
+    results = []
+    errors = []
+    for outcome in outcomes:
+        pdf_file = outcome["file_path"]
+        doc_result = outcome["document"]
+        if doc_result is not None:
+            results.append({
+                "file_name": os.path.basename(pdf_file),
+                "file_path": pdf_file,
+                "document_id": doc_result.id,
+                "case_id": doc_result.case_id,
+                "metadata": doc_result.metadata,
+                "chunks_count": len(doc_result.chunks),
+                "processing_status": "completed",
+                "llm_provider": provider,
+                "llm_model": model
+            })
+        else:
+            errors.append({
+                "file_name": os.path.basename(pdf_file),
+                "file_path": pdf_file,
+                "error": outcome["error"],
+                "processing_status": "failed"
+            })
+    return results, errors
+
+class _PendingDocument:
+    """Bookkeeping for a document whose chunks are waiting to be embedded"""
+
+    def __init__(self, file_path: str, analysis: Dict, chunks: List[DocumentChunk], to_embed: List[DocumentChunk]):
+        self.file_path = file_path
+        self.analysis = analysis
+        self.chunks = chunks
+        self.to_embed = to_embed
+        self.remaining = len(to_embed)
+        self.error: Optional[str] = None
+
+class FolderIngestionPipeline:
+    """Staged, concurrent ingestion of many PDFs into one case.
+
+    Stages overlap across files:
+    1. Text extraction runs in a process pool.
+    2. LLM analysis runs concurrently, capped at ``llm_concurrency``.
+    3. Chunks from every document are embedded together in batches of
+       ``embed_batch_size`` and written to the case vector store.
+
+    Documents already ingested unchanged are skipped, and only chunks whose
+    content is not yet embedded for the case are sent to the vector store.
+
+    ``run`` returns one outcome per input file, in input order, with either
+    the processed ``document`` or an ``error``. An optional ``progress``
+    object (such as a background ``Job``) is told as each file starts and
+    finishes via ``file_started(path)`` and ``file_finished(path, error=...)``.
+    """
+
+    def __init__(
+        self,
+        processor: LegalDocumentProcessor,
+        llm_concurrency: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        progress=None
+    ):
+        self.processor = processor
+        self.llm_concurrency = llm_concurrency or config.ingest_llm_concurrency
+        self.embed_batch_size = embed_batch_size or config.ingest_embed_batch_size
+        self.progress = progress
+
+    def _report(self, outcome: Dict[str, Any]):
+        if self.progress is None:
+            return
+        document = outcome["document"]
+        if outcome["error"] or document is None:
+            self.progress.file_finished(outcome["file_path"], error=outcome["error"] or "Not processed")
+        else:
+            self.progress.file_finished(
+                outcome["file_path"], document_id=document.id, chunks_count=len(document.chunks)
+            )
+
+    async def run(self, pdf_files: List[str], case_id: str) -> List[Dict[str, Any]]:
+        outcomes: Dict[str, Dict[str, Any]] = {
+            path: {"file_path": path, "document": None, "error": None} for path in pdf_files
+        }
+        queue: asyncio.Queue = asyncio.Queue()
+        llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        # Content hash -> vector ID of chunks whose vectors are confirmed written
+        embedded_content: Dict[str, str] = {}
+
+        async def prepare(file_path: str):
+            if self.progress is not None:
+                self.progress.file_started(file_path)
+            try:
+                loop = asyncio.get_running_loop()
+                document_hash = await loop.run_in_executor(None, sha256_file, file_path)
+                existing = await loop.run_in_executor(None, self.processor._find_ingested_document, case_id, document_hash)
+                if existing is not None:
+                    outcomes[file_path]["document"] = existing
+                    self._report(outcomes[file_path])
+                    return
+                page_count = await loop.run_in_executor(None, pdf_page_count, file_path)
+                if page_count >= config.stream_extract_min_pages:
+                    # Large documents are streamed page by page and stored on their own;
+                    # they take an LLM slot only for their analysis, not the whole stream
+                    outcomes[file_path]["document"] = await self.processor.process_document(
+                        file_path, case_id, llm_slots=llm_slots
+                    )
+                    self._report(outcomes[file_path])
+                    return
+                pages = await loop.run_in_executor(get_extract_pool(), extract_pdf_pages, file_path)
+                analysis = await self.processor._analyze_document("\n".join(pages), llm_slots)
+                chunks = await loop.run_in_executor(
+                    None, self.processor._create_legal_chunks, pages, analysis, case_id, document_hash
+                )
+                self.processor._tag_chunks(chunks, document_hash, os.path.basename(file_path))
+                to_embed = await loop.run_in_executor(
+                    None, self.processor._select_chunks_to_embed, case_id, chunks, None, embedded_content
+                )
+                await queue.put(_PendingDocument(file_path, analysis, chunks, to_embed))
+            except Exception as e:
+                outcomes[file_path]["error"] = str(e)
+                self._report(outcomes[file_path])
+
+        async def produce():
+            await asyncio.gather(*(prepare(path) for path in pdf_files))
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        await self._embed_batches(queue, case_id, outcomes, embedded_content)
+        await producer
+        # Documents that failed after embedding still left keyword index changes queued
+        await asyncio.to_thread(keyword_index_store.flush, case_id)
+
+        return [outcomes[path] for path in pdf_files]
+
+    async def _embed_batches(
+        self,
+        queue: asyncio.Queue,
+        case_id: str,
+        outcomes: Dict[str, Dict[str, Any]],
+        embedded_content: Dict[str, str]
+    ):
+        """Consume prepared documents and embed their chunks in cross-document batches.
+
+        Each written batch is recorded in ``embedded_content`` so documents
+        prepared later can reuse its vectors.
+        """
+        loop = asyncio.get_running_loop()
+        batch: List[tuple] = []  # (pending document, chunk)
+        done = False
+
+        while not done:
+            pending = await queue.get()
+            if pending is None:
+                done = True
+            else:
+                if not pending.to_embed:
+                    await self._finish(pending, case_id, outcomes)
+                batch.extend((pending, chunk) for chunk in pending.to_embed)
+
+            # Flush full batches, and whatever is left once every file is prepared
+            while len(batch) >= self.embed_batch_size or (done and batch):
+                current, batch = batch[:self.embed_batch_size], batch[self.embed_batch_size:]
+                try:
+                    await loop.run_in_executor(
+                        None, self.processor._add_to_vector_store, [chunk for _, chunk in current], case_id
+                    )
+                except Exception as e:
+                    for doc, _ in current:
+                        doc.error = doc.error or str(e)
+                else:
+                    embedded_content.update((chunk.metadata["content_hash"], chunk.id) for _, chunk in current)
+                for doc, _ in current:
+                    doc.remaining -= 1
+                    if doc.remaining == 0:
+                        await self._finish(doc, case_id, outcomes)
+
+    async def _finish(self, pending: _PendingDocument, case_id: str, outcomes: Dict[str, Dict[str, Any]]):
+        outcome = outcomes[pending.file_path]
+        if pending.error:
+            outcome["error"] = pending.error
+            self._report(outcome)
+            return
+        try:
+            doc_id = await self.processor._store_chunks_in_db(case_id, pending.chunks)
+            metadata = pending.chunks[0].metadata if pending.chunks else {}
+            await asyncio.to_thread(
+                self.processor._finish_document, case_id, metadata.get("document_name"), metadata.get("document_hash"),
+                len(pending.chunks)
+            )
+            outcome["document"] = CaseDocument(
+                id=doc_id,
+                case_id=case_id,
+                metadata=pending.analysis,
+                chunks=[chunk.id for chunk in pending.chunks]
+            )
+        except Exception as e:
+            outcome["error"] = str(e)
+        self._report(outcome)
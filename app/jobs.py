@@ -0,0 +1,315 @@
+import asyncio
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .config import config
+
+# In-process background jobs for long-running ingestion.
+#
+# Endpoints submit a job and return its ID immediately; a fixed number of
+# worker tasks on the API's event loop run queued jobs one at a time each.
+# Job records (status, per-file progress, timings, errors, result) live in
+# memory and, when JOB_STORE_PATH is set, in a local SQLite file so they
+# survive restarts. Records are written by a background thread, so progress
+# updates never wait on SQLite. Jobs run in the process that accepted them;
+# each record names that process, so several API processes can share a file
+# and only jobs whose process is gone are failed on startup.
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+class Job:
+    def __init__(self, kind: str, case_id: str, params: Dict[str, Any], files: List[str], job_id: Optional[str] = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.case_id = case_id
+        # Never persist credentials
+        self.params = {key: value for key, value in params.items() if key != "api_key"}
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.files: Dict[str, Dict[str, Any]] = {
+            path: {"file_name": os.path.basename(path), "status": QUEUED} for path in files
+        }
+        # Called after every progress update (the queue uses it to persist the record)
+        self.on_change: Optional[Callable[["Job"], None]] = None
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def file_started(self, file_path: str):
+        entry = self.files.setdefault(file_path, {"file_name": os.path.basename(file_path)})
+        entry.update(status=RUNNING, started_at=time.time())
+        self._changed()
+
+    def file_finished(self, file_path: str, error: Optional[str] = None, **info):
+        entry = self.files.setdefault(file_path, {"file_name": os.path.basename(file_path)})
+        now = time.time()
+        entry.update(status=FAILED if error else COMPLETED, finished_at=now, error=error, **info)
+        if entry.get("started_at"):
+            entry["seconds"] = round(now - entry["started_at"], 3)
+        self._changed()
+
+    def to_dict(self) -> Dict[str, Any]:
+        done = sum(1 for entry in self.files.values() if entry["status"] in (COMPLETED, FAILED))
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "case_id": self.case_id,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "seconds": round(self.finished_at - self.started_at, 3) if self.finished_at and self.started_at else None,
+            "progress": {"files_done": done, "files_total": len(self.files)},
+            # Copies, so a snapshot being saved isn't changed by later progress
+            "files": [dict(entry) for entry in self.files.values()],
+            "error": self.error,
+            "result": self.result
+        }
+
+def process_owner() -> str:
+    """Identifies the current process in job records"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Whether a job's owning process is still running (other hosts are assumed to be)"""
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+class SQLiteJobStore:
+    """Persists job records as JSON in a local SQLite file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, case_id TEXT, status TEXT, created_at REAL, data TEXT, owner TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_created_at ON jobs (created_at)")
+            # Files created before records named their process
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, record: Dict[str, Any], owner: Optional[str] = None):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, case_id, status, created_at, data, owner) VALUES (?, ?, ?, ?, ?, ?)",
+                (record["job_id"], record["case_id"], record["status"], record["created_at"],
+                 json.dumps(record, default=str), owner or process_owner())
+            )
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def recent(self, limit: int, case_id: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT data FROM jobs WHERE 1 = 1"
+        args: List[Any] = []
+        if case_id:
+            query += " AND case_id = ?"
+            args.append(case_id)
+        if status:
+            query += " AND status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            return [json.loads(row[0]) for row in conn.execute(query, args)]
+
+    def fail_orphaned(self, reason: str) -> int:
+        """Mark jobs left queued or running by a process that no longer exists as failed"""
+        count = 0
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+        for data, owner in rows:
+            if _owner_alive(owner):
+                continue
+            record = json.loads(data)
+            record.update(status=FAILED, error=reason, finished_at=time.time())
+            self.save(record, owner)
+            count += 1
+        return count
+
+class JobStoreWriter:
+    """Saves job records on a background thread, newest record per job only"""
+
+    def __init__(self, store: SQLiteJobStore):
+        self.store = store
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="job-store-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, record: Dict[str, Any]):
+        self._queue.put(record)
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Later records of a job supersede earlier ones
+            latest = {record["job_id"]: record for record in records}
+            for record in latest.values():
+                try:
+                    self.store.save(record)
+                except Exception as e:
+                    print(f"❌ Failed to save job {record['job_id']}: {e}")
+
+JobRunner = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+class JobQueue:
+    """Bounded pool of worker tasks running submitted jobs"""
+
+    def __init__(self, workers: int = 2, store: Optional[SQLiteJobStore] = None, history: int = 500):
+        self.workers = workers
+        self.store = store
+        self.history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._writer: Optional[JobStoreWriter] = None
+
+    def start(self):
+        """Start the workers; must be called from the serving event loop"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            if self.store is not None:
+                self._writer = JobStoreWriter(self.store)
+                self.store.fail_orphaned("Interrupted by a server restart")
+            self._tasks = [
+                asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)
+            ]
+
+    def submit(self, job: Job, runner: JobRunner) -> Job:
+        """Queue a job; must be called from the event loop"""
+        self.start()
+        job.on_change = self.save
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > self.history:
+            oldest = next(iter(self._jobs.values()))
+            if oldest.status in (QUEUED, RUNNING):
+                break
+            self._jobs.popitem(last=False)
+        self.save(job)
+        self._queue.put_nowait((job, runner))
+        return job
+
+    def save(self, job: Job):
+        """Persist a snapshot of the job without blocking the caller"""
+        if self._writer is not None:
+            self._writer.save(job.to_dict())
+
+    async def _work(self):
+        while True:
+            job, runner = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            self.save(job)
+            try:
+                job.result = await runner(job)
+                job.status = COMPLETED
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e)
+            job.finished_at = time.time()
+            self.save(job)
+            self._queue.task_done()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self.store.load(job_id) if self.store is not None else None
+
+    def list(self, limit: int = 50, case_id: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        if self.store is not None:
+            return self.store.recent(limit, case_id, status)
+        jobs = [
+            job.to_dict() for job in reversed(self._jobs.values())
+            if (not case_id or job.case_id == case_id) and (not status or job.status == status)
+        ]
+        return jobs[:limit]
+
+async def run_folder_job(job: Job, llm_config, pdf_files: List[str]) -> Dict[str, Any]:
+    """Ingest a folder's PDFs into the job's case, reporting per-file progress"""
+    from .rag_pipeline import LegalDocumentProcessor
+    from .ingestion import FolderIngestionPipeline, split_folder_outcomes
+    processor = LegalDocumentProcessor(llm_config)
+    outcomes = await FolderIngestionPipeline(processor, progress=job).run(pdf_files, job.case_id)
+    results, errors = split_folder_outcomes(outcomes, llm_config.provider.value, llm_config.model)
+    if not results:
+        raise RuntimeError(f"All {len(errors)} documents failed to process")
+    return {
+        "total_files": len(pdf_files),
+        "successful_processing": len(results),
+        "failed_processing": len(errors),
+        "total_chunks": sum(r["chunks_count"] for r in results),
+        "results": results,
+        "errors": errors
+    }
+
+async def run_document_job(job: Job, llm_config, file_path: str, document_name: str) -> Dict[str, Any]:
+    """Ingest one uploaded document, deleting the upload when done"""
+    from .rag_pipeline import LegalDocumentProcessor
+    try:
+        job.file_started(file_path)
+        try:
+            doc_result = await LegalDocumentProcessor(llm_config).process_document(
+                file_path, job.case_id, document_name=document_name
+            )
+        except Exception as e:
+            job.file_finished(file_path, error=str(e))
+            raise
+        job.file_finished(file_path, document_id=doc_result.id, chunks_count=len(doc_result.chunks))
+        return {
+            "document_id": doc_result.id,
+            "metadata": doc_result.metadata,
+            "chunks_count": len(doc_result.chunks)
+        }
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+# Global job queue
+job_queue = JobQueue(
+    workers=config.job_workers,
+    store=SQLiteJobStore(config.job_store_path) if config.job_store_path else None
+)
@@ -0,0 +1,259 @@
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from langchain.docstore.document import Document
+from .config import config
+from .vector_store import case_store_path, vector_store_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: index writes are only serialized within the process
+    fcntl = None
+
+KEYWORD_INDEX_FILE = "keyword_index.json"
+
+# Words joined by '-', '.', '/' or ',' stay together so identifiers such as
+# claim numbers, CPT codes, dates and dollar amounts can be matched exactly
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-./,][a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound identifiers also yield their parts"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+def keyword_index_path(case_id: str) -> str:
+    """Stored next to the case's vector store, or under the keyword directory when sharded"""
+    if vector_store_cache.sharded:
+        return os.path.join(config.chroma_dir, "_keyword", case_id, KEYWORD_INDEX_FILE)
+    return os.path.join(case_store_path(case_id), KEYWORD_INDEX_FILE)
+
+_local_write_lock = threading.Lock()
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on ``{path}.lock``, held across processes where supported"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if fcntl is None:
+        with _local_write_lock:
+            yield
+        return
+    with open(f"{path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class KeywordIndex:
+    """BM25 inverted index over the chunks in a case's vector store.
+
+    Entries are keyed by the same IDs as the vectors, and the chunk text and
+    metadata are kept so keyword hits can be returned without touching
+    Chroma.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Dict] = {}
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def add(self, doc_id: str, text: str, metadata: Dict):
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self.postings[term][doc_id] = count
+        self.documents[doc_id] = {"text": text, "metadata": metadata}
+        self.lengths[doc_id] = sum(terms.values())
+        self.total_length += self.lengths[doc_id]
+
+    def remove(self, doc_id: str):
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        for term in set(tokenize(document["text"])):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id, 0)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Return up to ``k`` (doc_id, BM25 score) pairs, best first"""
+        if not self.documents:
+            return []
+        count = len(self.documents)
+        average_length = self.total_length / count or 1
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def copy(self) -> "KeywordIndex":
+        """Independent copy, so updates never mutate an index being searched"""
+        index = KeywordIndex(k1=self.k1, b=self.b)
+        index.documents = dict(self.documents)
+        index.postings = defaultdict(dict, {term: dict(postings) for term, postings in self.postings.items()})
+        index.lengths = dict(self.lengths)
+        index.total_length = self.total_length
+        return index
+
+    def document(self, doc_id: str) -> Document:
+        entry = self.documents[doc_id]
+        return Document(page_content=entry["text"], metadata=entry["metadata"])
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Unique temp name, so concurrent writers never share a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"k1": self.k1, "b": self.b, "documents": self.documents}, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "KeywordIndex":
+        with open(path) as f:
+            data = json.load(f)
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        for doc_id, entry in data["documents"].items():
+            index.add(doc_id, entry["text"], entry["metadata"])
+        return index
+
+class KeywordIndexStore:
+    """Loads, caches and updates the per-case keyword indexes.
+
+    Cached indexes are reloaded when the file on disk changes, so updates
+    made by another worker process are picked up. Changes are queued in
+    memory by ``update`` and written once per document by ``flush``, under
+    a file lock shared by all worker processes.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self._indexes: "OrderedDict[str, Tuple[float, KeywordIndex]]" = OrderedDict()
+        # case_id -> {doc_id: (text, metadata) to add, or None to remove}
+        self._pending: Dict[str, Dict[str, Optional[Tuple[str, Dict]]]] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, case_id: str, mtime: float, index: KeywordIndex):
+        with self._lock:
+            self._indexes[case_id] = (mtime, index)
+            self._indexes.move_to_end(case_id)
+            while len(self._indexes) > self.capacity:
+                self._indexes.popitem(last=False)
+
+    def _cached(self, case_id: str, mtime: float) -> Optional[KeywordIndex]:
+        with self._lock:
+            cached = self._indexes.get(case_id)
+            if cached is None or cached[0] != mtime:
+                return None
+            self._indexes.move_to_end(case_id)
+            return cached[1]
+
+    def get(self, case_id: str) -> Optional[KeywordIndex]:
+        """Return the case's index, or None if it has not been built"""
+        path = keyword_index_path(case_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        index = self._cached(case_id, mtime)
+        if index is None:
+            index = KeywordIndex.load(path)
+            self._remember(case_id, mtime, index)
+        return index
+
+    def modified_at(self, case_id: str) -> Optional[float]:
+        """When the case's index (and so its documents) last changed"""
+        try:
+            return os.path.getmtime(keyword_index_path(case_id))
+        except OSError:
+            return None
+
+    def update(self, case_id: str, add: Optional[List[Tuple[str, str, Dict]]] = None, remove: Optional[List[str]] = None):
+        """Queue (doc_id, text, metadata) entries to add and IDs to remove until the next flush"""
+        with self._lock:
+            changes = self._pending.setdefault(case_id, {})
+            for doc_id in remove or []:
+                changes[doc_id] = None
+            for doc_id, text, metadata in add or []:
+                changes[doc_id] = (text, metadata)
+
+    def flush(self, case_id: str):
+        """Apply the case's queued changes and persist the index in one write"""
+        with self._lock:
+            changes = self._pending.pop(case_id, None)
+        if not changes:
+            return
+        path = keyword_index_path(case_id)
+        with _file_lock(path):
+            # Re-read under the lock in case another process wrote since it was cached
+            if os.path.exists(path):
+                mtime = os.path.getmtime(path)
+                current = self._cached(case_id, mtime)
+                index = current.copy() if current is not None else KeywordIndex.load(path)
+            elif any(entry is not None for entry in changes.values()):
+                index = KeywordIndex()
+            else:
+                return
+            for doc_id, entry in changes.items():
+                if entry is None:
+                    index.remove(doc_id)
+                else:
+                    index.add(doc_id, *entry)
+            index.save(path)
+            self._remember(case_id, os.path.getmtime(path), index)
+
+    def rebuild(self, case_id: str) -> int:
+        """Rebuild a case's index from the contents of its vector store"""
+        vectordb = vector_store_cache.get(case_id)
+        if vectordb is None:
+            return 0
+        with self._lock:
+            # The vector store already holds any queued changes
+            self._pending.pop(case_id, None)
+        index = KeywordIndex()
+        for doc_id, text, metadata in vectordb.get_all():
+            index.add(doc_id, text, metadata)
+        path = keyword_index_path(case_id)
+        with _file_lock(path):
+            index.save(path)
+            self._remember(case_id, os.path.getmtime(path), index)
+        return len(index.documents)
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Fuse several rankings of IDs; each contributes 1 / (k + rank)"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+
+# Global keyword index store
+keyword_index_store = KeywordIndexStore(capacity=config.keyword_index_cache_size)
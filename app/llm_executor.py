@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional
+from .config import LLMProvider, LLMConfig, config
+from .llm_factory import LLMFactory
+
+# Providers whose LangChain client has a real async implementation.
+# The community Ollama client only goes async through aiohttp, which we do
+# not ship, so it runs on the thread pool instead.
+NATIVE_ASYNC_PROVIDERS = {LLMProvider.OPENAI}
+
+class LLMExecutor:
+    """Runs LLM calls without blocking the event loop.
+
+    Providers with native async support are awaited through ``ainvoke``;
+    everything else runs ``invoke`` on a bounded thread pool. Each provider
+    has its own concurrency limit so a slow local Ollama cannot starve
+    OpenAI traffic (and vice versa).
+    """
+
+    def __init__(self, max_workers: int = 8, provider_limits: Optional[Dict[LLMProvider, int]] = None):
+        self.max_workers = max_workers
+        self.provider_limits = provider_limits or {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Semaphores belong to the event loop they are used on, so each loop
+        # (e.g. the API's and a script's asyncio.run) gets its own set
+        self._semaphores: "weakref.WeakKeyDictionary[Any, Dict[LLMProvider, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+            return self._pool
+
+    def _semaphore(self, provider: LLMProvider) -> asyncio.Semaphore:
+        """The provider's concurrency limit on the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            semaphore = semaphores.get(provider)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.provider_limits.get(provider, self.max_workers))
+                semaphores[provider] = semaphore
+            return semaphore
+
+    async def ainvoke(self, llm, prompt: Any, provider: LLMProvider) -> str:
+        """Invoke an LLM asynchronously and return the response text"""
+        async with self._semaphore(provider):
+            if provider in NATIVE_ASYNC_PROVIDERS:
+                result = await llm.ainvoke(prompt)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.pool, llm.invoke, prompt)
+        return _response_text(result)
+
+    async def astream(self, llm, prompt: Any, provider: LLMProvider) -> AsyncIterator[str]:
+        """Stream response text as the LLM produces it.
+
+        The concurrency slot is held until the stream ends. Blocking clients
+        are iterated on the thread pool and hand tokens back through a
+        queue; closing the stream early stops the worker at the next token.
+        """
+        async with self._semaphore(provider):
+            if provider in NATIVE_ASYNC_PROVIDERS:
+                async for chunk in llm.astream(prompt):
+                    text = _response_text(chunk)
+                    if text:
+                        yield text
+                return
+
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            cancelled = threading.Event()
+            done = object()
+
+            def produce():
+                try:
+                    for chunk in llm.stream(prompt):
+                        if cancelled.is_set():
+                            break
+                        loop.call_soon_threadsafe(queue.put_nowait, _response_text(chunk))
+                    loop.call_soon_threadsafe(queue.put_nowait, done)
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, e)
+
+            loop.run_in_executor(self.pool, produce)
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is done:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    if item:
+                        yield item
+            finally:
+                cancelled.set()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+def _response_text(result: Any) -> str:
+    """Chat models return messages, completion models return strings"""
+    return getattr(result, "content", result)
+
+class AsyncLLM:
+    """An LLM client bound to the shared executor"""
+
+    def __init__(self, llm_config: LLMConfig):
+        self.config = llm_config
+        self.llm = LLMFactory.create_llm(llm_config)
+
+    async def ainvoke(self, prompt: Any) -> str:
+        return await llm_executor.ainvoke(self.llm, prompt, self.config.provider)
+
+    def astream(self, prompt: Any) -> AsyncIterator[str]:
+        return llm_executor.astream(self.llm, prompt, self.config.provider)
+
+# Global executor instance
+llm_executor = LLMExecutor(
+    max_workers=config.llm_max_workers,
+    provider_limits=config.llm_concurrency
+)
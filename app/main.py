@@ -1,21 +1,30 @@
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Body, Form, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
+import asyncio
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.colors import black
+from datetime import datetime
 from . import models, db
-from .rag_pipeline import LegalDocumentProcessor, LegalRAGEngine
 from .config import LLMProvider, LLMConfig, config
-from .llm_factory import LLMFactory
+from .case_context import load_case, load_cases, load_all_cases, case_totals, stored_case_stats, system_rollup, serialize_case_context
+from .case_stats import ensure_case_stats
+from .chunk_store import load_chunks, ensure_ingested_documents
+from .engines import engine_warmup, aget_rag_engine, aget_doc_processor
+from .jobs import Job, job_queue, run_folder_job, run_document_job
+from .uploads import save_upload, saved_upload
+from .streaming import sse_response
+from .demand_letters import draft_letter, run_letter_job, stream_letters_zip
 
 models.Base.metadata.create_all(bind=db.engine)
 
+# Populate the materialized statistics tables, and mark documents already
+# ingested as complete, on first start after upgrading
+with db.SessionLocal() as _stats_session:
+    ensure_case_stats(_stats_session)
+    ensure_ingested_documents(_stats_session)
+
 app = FastAPI(
     title="Legal AI Case Management System",
     description="""
@@ -60,9 +69,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG components
-rag_engine = LegalRAGEngine()
-doc_processor = LegalDocumentProcessor()
+# RAG components are created lazily (see app/engines.py); optionally warm
+# them up in the background so the first RAG request doesn't pay for it
+@app.on_event("startup")
+def start_engine_warmup():
+    if config.engine_warmup:
+        engine_warmup.start_background()
+
+# Background job workers run on the serving event loop
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
 
 def get_db():
     db_session = db.SessionLocal()
@@ -71,6 +88,22 @@ def get_db():
     finally:
         db_session.close()
 
+@app.get("/health/live", tags=["System"], summary="Liveness check", description="Report that the API process is up")
+def health_live():
+    """Liveness probe: the process is serving requests"""
+    return {"status": "ok"}
+
+@app.get("/health/ready", tags=["System"], summary="Readiness check", description="Report RAG engine warm-up state; returns 503 until the engines are ready")
+def health_ready():
+    """Readiness probe: RAG engines created and embedding model loaded"""
+    status = engine_warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/system/db-pool", tags=["System"], summary="Database pool metrics", description="Connection pool occupancy and cumulative connect/checkout/checkin/invalidation counts for this worker")
+def get_db_pool_metrics():
+    """Database connection pool metrics for this worker process"""
+    return db.pool_metrics()
+
 # Basic CRUD endpoints
 @app.get("/cases", tags=["Case Management"], summary="Get all cases", description="Retrieve all cases from the database")
 def get_cases(db: Session = Depends(get_db)):
@@ -96,6 +129,7 @@ def get_financials(db: Session = Depends(get_db)):
 async def get_system_overview():
     """Get comprehensive system overview with all cases, statistics, and details"""
     try:
+        rag_engine = await aget_rag_engine()
         response = await rag_engine.query("overall cases details", "system", {})
         return {
             "overview": response.answer,
@@ -113,6 +147,7 @@ async def get_system_overview():
 async def get_system_statistics():
     """Get system statistics and case counts"""
     try:
+        rag_engine = await aget_rag_engine()
         response = await rag_engine.query("total number of cases", "system", {})
         return {
             "statistics": response.answer,
@@ -125,6 +160,7 @@ async def get_system_statistics():
 async def get_system_timeline():
     """Get comprehensive timeline of all cases with dates"""
     try:
+        rag_engine = await aget_rag_engine()
         response = await rag_engine.query("show me all cases with their dates", "system", {})
         return {
             "timeline": response.answer,
@@ -133,6 +169,34 @@ async def get_system_timeline():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _comprehensive_case_data(case: models.Case, counts: Dict[str, int]) -> Dict[str, Any]:
+    """Build the comprehensive payload for an eager-loaded case"""
+    return {
+        "case": {
+            "case_id": case.case_id,
+            "case_type": case.case_type,
+            "status": case.status,
+            "date_filed": case.date_filed.strftime('%Y-%m-%d') if case.date_filed else 'Unknown',
+            "summary": case.case_summary
+        },
+        "parties": [{"type": p.party_type, "name": p.name, "contact": p.contact_info} for p in case.parties],
+        "timeline_events": [
+            {
+                'date': e.event_date.strftime('%Y-%m-%d') if e.event_date else 'Unknown',
+                'description': e.description
+            } for e in case.events
+        ],
+        "financials": {
+            "total_amount": counts.get("total_amount", 0),
+            "records": [{"type": f.record_type, "amount": f.amount, "description": f.description} for f in case.financials]
+        },
+        "statistics": {
+            "parties_count": counts.get("parties_count", 0),
+            "events_count": counts.get("events_count", 0),
+            "financials_count": counts.get("financials_count", 0)
+        }
+    }
+
 @app.get("/cases/{case_id}/comprehensive")
 async def get_case_comprehensive(case_id: str):
     """Get comprehensive information for a specific case including timeline, parties, financials"""
@@ -140,45 +204,12 @@ async def get_case_comprehensive(case_id: str):
         # Get case data
         db_session = db.SessionLocal()
         try:
-            case = db_session.query(models.Case).filter(models.Case.case_id == case_id).first()
+            case = load_case(db_session, case_id)
             if not case:
                 raise HTTPException(status_code=404, detail=f"Case {case_id} not found")
             
-            parties = db_session.query(models.Party).filter(models.Party.case_id == case_id).all()
-            events = db_session.query(models.TimelineEvent).filter(models.TimelineEvent.case_id == case_id).all()
-            financials = db_session.query(models.FinancialRecord).filter(models.FinancialRecord.case_id == case_id).all()
-            
-            # Calculate financial totals
-            total_amount = sum(f.amount for f in financials) if financials else 0
-            
-            # Format timeline events
-            timeline_events = []
-            for event in events:
-                timeline_events.append({
-                    'date': event.event_date.strftime('%Y-%m-%d') if event.event_date else 'Unknown',
-                    'description': event.description
-                })
-            
-            return {
-                "case": {
-                    "case_id": case.case_id,
-                    "case_type": case.case_type,
-                    "status": case.status,
-                    "date_filed": case.date_filed.strftime('%Y-%m-%d') if case.date_filed else 'Unknown',
-                    "summary": case.case_summary
-                },
-                "parties": [{"type": p.party_type, "name": p.name, "contact": p.contact_info} for p in parties],
-                "timeline_events": timeline_events,
-                "financials": {
-                    "total_amount": total_amount,
-                    "records": [{"type": f.record_type, "amount": f.amount, "description": f.description} for f in financials]
-                },
-                "statistics": {
-                    "parties_count": len(parties),
-                    "events_count": len(events),
-                    "financials_count": len(financials)
-                }
-            }
+            counts = case_totals(db_session, [case_id]).get(case_id, {})
+            return _comprehensive_case_data(case, counts)
         finally:
             db_session.close()
             
@@ -189,68 +220,40 @@ async def get_case_comprehensive(case_id: str):
 async def get_all_system_information():
     """Get all system information including overview, statistics, timeline, and all cases"""
     try:
-        # Get system overview
-        overview_response = await rag_engine.query("overall cases details", "system", {})
-        
-        # Get system statistics
-        stats_response = await rag_engine.query("total number of cases", "system", {})
-        
-        # Get system timeline
-        timeline_response = await rag_engine.query("show me all cases with their dates", "system", {})
+        rag_engine = await aget_rag_engine()
         
-        # Get all cases with comprehensive data
+        # Load every case with its details once; the system answers and the listing all reuse it
         db_session = db.SessionLocal()
         try:
-            cases = db_session.query(models.Case).all()
-            all_cases_data = []
-            
-            for case in cases:
-                parties = db_session.query(models.Party).filter(models.Party.case_id == case.case_id).all()
-                events = db_session.query(models.TimelineEvent).filter(models.TimelineEvent.case_id == case.case_id).all()
-                financials = db_session.query(models.FinancialRecord).filter(models.FinancialRecord.case_id == case.case_id).all()
-                
-                total_amount = sum(f.amount for f in financials) if financials else 0
-                
-                timeline_events = []
-                for event in events:
-                    timeline_events.append({
-                        'date': event.event_date.strftime('%Y-%m-%d') if event.event_date else 'Unknown',
-                        'description': event.description
-                    })
-                
-                all_cases_data.append({
-                    "case": {
-                        "case_id": case.case_id,
-                        "case_type": case.case_type,
-                        "status": case.status,
-                        "date_filed": case.date_filed.strftime('%Y-%m-%d') if case.date_filed else 'Unknown',
-                        "summary": case.case_summary
-                    },
-                    "parties": [{"type": p.party_type, "name": p.name, "contact": p.contact_info} for p in parties],
-                    "timeline_events": timeline_events,
-                    "financials": {
-                        "total_amount": total_amount,
-                        "records": [{"type": f.record_type, "amount": f.amount, "description": f.description} for f in financials]
-                    },
-                    "statistics": {
-                        "parties_count": len(parties),
-                        "events_count": len(events),
-                        "financials_count": len(financials)
-                    }
-                })
+            cases = load_all_cases(db_session)
+            totals = stored_case_stats(db_session)
+            rollup = system_rollup(db_session)
+            all_cases_data = [
+                _comprehensive_case_data(case, totals.get(case.case_id, {}))
+                for case in cases
+            ]
         finally:
             db_session.close()
         
+        # Get system overview
+        overview_response = await rag_engine.system_query("overall cases details", cases)
+        
+        # Get system statistics
+        stats_response = await rag_engine.system_query("total number of cases", cases)
+        
+        # Get system timeline
+        timeline_response = await rag_engine.system_query("show me all cases with their dates", cases)
+        
         return {
             "system_overview": overview_response.answer,
             "system_statistics": stats_response.answer,
             "system_timeline": timeline_response.answer,
             "all_cases": all_cases_data,
             "summary": {
-                "total_cases": len(cases),
-                "total_financial_amount": sum(case['financials']['total_amount'] for case in all_cases_data),
-                "total_events": sum(case['statistics']['events_count'] for case in all_cases_data),
-                "total_parties": sum(case['statistics']['parties_count'] for case in all_cases_data)
+                "total_cases": sum(values["cases_count"] for values in rollup.values()),
+                "total_financial_amount": sum(values["total_amount"] for values in rollup.values()),
+                "total_events": sum(values["events_count"] for values in rollup.values()),
+                "total_parties": sum(values["parties_count"] for values in rollup.values())
             }
         }
     except Exception as e:
@@ -269,6 +272,7 @@ async def rag_query(
         if not case_id:
             case_id = "system"
         
+        rag_engine = await aget_rag_engine()
         response = await rag_engine.query(query, case_id, context)
         return {
             "answer": response.answer,
@@ -280,6 +284,18 @@ async def rag_query(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/rag/query/stream", tags=["RAG"], summary="Stream RAG query", description="Query the RAG system and stream the answer as server-sent events: sources first, then answer tokens as the LLM generates them, then done")
+async def rag_query_stream(
+    query: str = Body(..., description="Natural language query about the case or documents"),
+    case_id: str = Body(default=None, description="Case ID to query (optional)"),
+    context: Dict[str, Any] = Body(default={}, description="Additional context for the query")
+):
+    """Streaming variant of /rag/query (text/event-stream)"""
+    if not case_id:
+        case_id = "system"
+    rag_engine = await aget_rag_engine()
+    return sse_response(rag_engine.query_stream(query, case_id, context), case_id=case_id, query=query)
+
 @app.post("/rag/query-with-provider", tags=["RAG"], summary="Query RAG with custom LLM provider", description="Query the RAG system with a custom LLM provider configuration")
 async def rag_query_with_provider(
     query: str = Form(..., description="Natural language query about the case or documents"),
@@ -307,6 +323,7 @@ async def rag_query_with_provider(
         )
         
         # Create RAG engine with custom LLM configuration
+        from .rag_pipeline import LegalRAGEngine
         custom_rag_engine = LegalRAGEngine(llm_config)
         
         response = await custom_rag_engine.query(query, case_id, context)
@@ -322,6 +339,52 @@ async def rag_query_with_provider(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/rag/search", tags=["RAG"], summary="Search all cases", description="Firm-wide search for document chunks across every case (requires VECTOR_STORE_MODE=sharded)")
+async def rag_search_all(
+    query: str = Body(..., description="Natural language or keyword search"),
+    k: int = Body(default=10, description="Number of chunks to return")
+):
+    """Search document chunks across all cases"""
+    try:
+        rag_engine = await aget_rag_engine()
+        chunks = await rag_engine.search_all(query, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "query": query,
+        "results": [
+            {
+                "case_id": chunk.metadata.get("case_id"),
+                "content": chunk.page_content,
+                "metadata": chunk.metadata
+            }
+            for chunk in chunks
+        ]
+    }
+
+@app.get("/rag/chunks/{chunk_id}", tags=["RAG"], summary="Get document chunk", description="Look up a stored document chunk by the chunk_id returned in query sources")
+def get_document_chunk(chunk_id: str, db: Session = Depends(get_db)):
+    """Resolve a citation from query sources to the stored chunk text"""
+    chunks = load_chunks(db, [chunk_id])
+    if not chunks:
+        raise HTTPException(status_code=404, detail=f"Chunk {chunk_id} not found")
+    chunk = chunks[0]
+    return {
+        "chunk_id": chunk.chunk_id,
+        "case_id": chunk.case_id,
+        "document_name": chunk.document_name,
+        "document_hash": chunk.document_hash,
+        "chunk_index": chunk.chunk_index,
+        "page_number": chunk.page_number,
+        "page_end": chunk.page_end,
+        "start_offset": chunk.start_offset,
+        "end_offset": chunk.end_offset,
+        "section_heading": chunk.section_heading,
+        "content": chunk.content
+    }
+
 @app.post("/rag/process_document", tags=["Document Processing"], summary="Process document", description="Process and analyze legal documents using the default LLM configuration")
 async def process_document(
     file: UploadFile = File(..., description="PDF document to process"),
@@ -332,17 +395,10 @@ async def process_document(
         if not case_id:
             raise HTTPException(status_code=400, detail="case_id is required")
         
-        # Save uploaded file temporarily
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Process document
-        doc_result = await doc_processor.process_document(temp_path, case_id)
-        
-        # Clean up temp file
-        os.remove(temp_path)
+        # Stage the upload in a unique temp file, removed once processed
+        async with saved_upload(file) as temp_path:
+            doc_processor = await aget_doc_processor()
+            doc_result = await doc_processor.process_document(temp_path, case_id, document_name=file.filename)
         
         return {
             "document_id": doc_result.id,
@@ -351,6 +407,8 @@ async def process_document(
             "chunks_count": len(doc_result.chunks),
             "processing_status": "completed"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -379,19 +437,12 @@ async def process_document_with_provider(
         )
         
         # Create document processor with custom LLM configuration
+        from .rag_pipeline import LegalDocumentProcessor
         custom_doc_processor = LegalDocumentProcessor(llm_config)
         
-        # Save uploaded file temporarily
-        temp_path = f"temp_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Process document
-        doc_result = await custom_doc_processor.process_document(temp_path, case_id)
-        
-        # Clean up temp file
-        os.remove(temp_path)
+        # Stage the upload in a unique temp file, removed once processed
+        async with saved_upload(file) as temp_path:
+            doc_result = await custom_doc_processor.process_document(temp_path, case_id, document_name=file.filename)
         
         return {
             "document_id": doc_result.id,
@@ -402,6 +453,8 @@ async def process_document_with_provider(
             "llm_provider": provider,
             "llm_model": model
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -440,45 +493,19 @@ async def process_folder(
         )
         
         # Create document processor with custom LLM configuration
+        from .rag_pipeline import LegalDocumentProcessor
+        from .ingestion import FolderIngestionPipeline, list_pdf_files, split_folder_outcomes
         custom_doc_processor = LegalDocumentProcessor(llm_config)
         
         # Find all PDF files in the folder
-        pdf_files = []
-        for file in os.listdir(folder_path):
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(folder_path, file))
+        pdf_files = list_pdf_files(folder_path)
         
         if not pdf_files:
             raise HTTPException(status_code=400, detail=f"No PDF files found in folder: {folder_path}")
         
-        # Process all documents
-        results = []
-        errors = []
-        
-        for pdf_file in pdf_files:
-            try:
-                # Process document
-                doc_result = await custom_doc_processor.process_document(pdf_file, case_id)
-                
-                results.append({
-                    "file_name": os.path.basename(pdf_file),
-                    "file_path": pdf_file,
-                    "document_id": doc_result.id,
-                    "case_id": doc_result.case_id,
-                    "metadata": doc_result.metadata,
-                    "chunks_count": len(doc_result.chunks),
-                    "processing_status": "completed",
-                    "llm_provider": provider,
-                    "llm_model": model
-                })
-                
-            except Exception as e:
-                errors.append({
-                    "file_name": os.path.basename(pdf_file),
-                    "file_path": pdf_file,
-                    "error": str(e),
-                    "processing_status": "failed"
-                })
+        # Process all documents through the concurrent ingestion pipeline
+        outcomes = await FolderIngestionPipeline(custom_doc_processor).run(pdf_files, case_id)
+        results, errors = split_folder_outcomes(outcomes, provider, model)
         
         return {
             "case_id": case_id,
@@ -535,45 +562,19 @@ async def process_folder_json(request: Request):
         )
         
         # Create document processor
+        from .rag_pipeline import LegalDocumentProcessor
+        from .ingestion import FolderIngestionPipeline, list_pdf_files, split_folder_outcomes
         custom_doc_processor = LegalDocumentProcessor(llm_config)
         
         # Find all PDF files in the folder
-        pdf_files = []
-        for file in os.listdir(folder_path):
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(folder_path, file))
+        pdf_files = list_pdf_files(folder_path)
         
         if not pdf_files:
             raise HTTPException(status_code=400, detail=f"No PDF files found in folder: {folder_path}")
         
-        # Process all documents
-        results = []
-        errors = []
-        
-        for pdf_file in pdf_files:
-            try:
-                # Process document
-                doc_result = await custom_doc_processor.process_document(pdf_file, case_id)
-                
-                results.append({
-                    "file_name": os.path.basename(pdf_file),
-                    "file_path": pdf_file,
-                    "document_id": doc_result.id,
-                    "case_id": doc_result.case_id,
-                    "metadata": doc_result.metadata,
-                    "chunks_count": len(doc_result.chunks),
-                    "processing_status": "completed",
-                    "llm_provider": provider,
-                    "llm_model": model
-                })
-                
-            except Exception as e:
-                errors.append({
-                    "file_name": os.path.basename(pdf_file),
-                    "file_path": pdf_file,
-                    "error": str(e),
-                    "processing_status": "failed"
-                })
+        # Process all documents through the concurrent ingestion pipeline
+        outcomes = await FolderIngestionPipeline(custom_doc_processor).run(pdf_files, case_id)
+        results, errors = split_folder_outcomes(outcomes, provider, model)
         
         return {
             "case_id": case_id,
@@ -594,6 +595,104 @@ async def process_folder_json(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process folder: {str(e)}")
 
+@app.post("/jobs/process_folder", tags=["Jobs"], summary="Queue folder processing", description="Queue processing of every PDF in a folder and return a job ID to poll at /jobs/{job_id}")
+async def submit_folder_job(request: Request):
+    """Queue folder processing as a background job (same JSON body as /rag/process_folder_json)"""
+    body = await request.json()
+    folder_path = body.get("folder_path", "")
+    case_id = body.get("case_id", "")
+    provider = body.get("provider", "ollama")
+    model = body.get("model", "mistral")
+    
+    if not case_id:
+        raise HTTPException(status_code=400, detail="case_id is required")
+    if not folder_path:
+        raise HTTPException(status_code=400, detail="folder_path is required")
+    if not os.path.isdir(folder_path):
+        raise HTTPException(status_code=400, detail=f"Folder path does not exist or is not a directory: {folder_path}")
+    
+    from .ingestion import list_pdf_files
+    pdf_files = list_pdf_files(folder_path)
+    if not pdf_files:
+        raise HTTPException(status_code=400, detail=f"No PDF files found in folder: {folder_path}")
+    
+    try:
+        llm_config = LLMConfig(
+            provider=LLMProvider(provider),
+            model=model,
+            base_url=body.get("base_url"),
+            api_key=body.get("api_key"),
+            temperature=body.get("temperature", 0.0)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job = Job("process_folder", case_id, body, pdf_files)
+    job_queue.submit(job, lambda job: run_folder_job(job, llm_config, pdf_files))
+    return job.to_dict()
+
+@app.post("/jobs/process_document", tags=["Jobs"], summary="Queue document processing", description="Upload a document and queue its processing; returns a job ID to poll at /jobs/{job_id}")
+async def submit_document_job(
+    file: UploadFile = File(..., description="PDF document to process"),
+    case_id: str = Form(..., description="Case ID to associate the document with"),
+    provider: str = Form(default="ollama", description="LLM provider: ollama or openai"),
+    model: str = Form(default="mistral", description="Model name for the LLM provider"),
+    base_url: Optional[str] = Form(default=None, description="Base URL for Ollama (optional)"),
+    api_key: Optional[str] = Form(default=None, description="API key for OpenAI (optional)"),
+    temperature: float = Form(default=0.0, description="Temperature for LLM generation")
+):
+    """Queue a single uploaded document as a background job"""
+    if not case_id:
+        raise HTTPException(status_code=400, detail="case_id is required")
+    try:
+        llm_config = LLMConfig(
+            provider=LLMProvider(provider),
+            model=model,
+            base_url=base_url,
+            api_key=api_key,
+            temperature=temperature
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # The job outlives the request, so it deletes the staged upload when done
+    temp_path = await save_upload(file)
+    
+    params = {"file_name": file.filename, "provider": provider, "model": model, "base_url": base_url, "temperature": temperature}
+    job = Job("process_document", case_id, params, [temp_path])
+    job.files[temp_path]["file_name"] = file.filename
+    try:
+        job_queue.submit(job, lambda job: run_document_job(job, llm_config, temp_path, file.filename))
+    except BaseException:
+        # Never queued, so no job will clean it up
+        os.remove(temp_path)
+        raise
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}", tags=["Jobs"], summary="Get job status", description="Status, per-file progress, timings, errors and result of a background job")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}/pdf", tags=["Jobs"], summary="Download job PDF", description="PDF of the letter drafted by a completed demand_letter job")
+async def get_job_pdf(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None or job["kind"] != "demand_letter":
+        raise HTTPException(status_code=404, detail=f"Demand letter job not found: {job_id}")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return await _generate_pdf_internal(job["result"]["letter_content"], job["case_id"])
+
+@app.get("/jobs", tags=["Jobs"], summary="List jobs", description="Most recent background jobs, optionally filtered by case and status")
+def list_jobs(
+    case_id: Optional[str] = Query(default=None, description="Only jobs for this case"),
+    status: Optional[str] = Query(default=None, description="queued, running, completed or failed"),
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    return {"jobs": job_queue.list(limit=limit, case_id=case_id, status=status)}
+
 @app.post("/mcp/generate_demand_letter", tags=["Document Generation"], summary="Generate demand letter", description="Generate a demand letter using RAG and case data")
 async def generate_demand_letter(
     case_id: str = Query(..., description="Case ID to generate letter for"),
@@ -608,37 +707,18 @@ async def generate_demand_letter(
         # Get case data
         db_session = db.SessionLocal()
         try:
-            case = db_session.query(models.Case).filter(models.Case.case_id == case_id).first()
+            case = load_case(db_session, case_id)
             if not case:
                 raise HTTPException(status_code=404, detail=f"Case {case_id} not found")
             
-            parties = db_session.query(models.Party).filter(models.Party.case_id == case_id).all()
-            events = db_session.query(models.TimelineEvent).filter(models.TimelineEvent.case_id == case_id).all()
-            financials = db_session.query(models.FinancialRecord).filter(models.FinancialRecord.case_id == case_id).all()
-            
-            # Query RAG for relevant information
-            rag_queries = [
-                "Summarize medical expenses and treatment details",
-                "Calculate lost wages and income impact",
-                "Assess pain and suffering factors",
-                "Identify liability and negligence evidence"
-            ]
-            
-            rag_results = {}
-            for query in rag_queries:
-                response = await rag_engine.query(query, case_id, additional_context)
-                rag_results[query] = response.answer
-            
-            # Generate letter content
-            letter_content = await _generate_letter_content(
-                case, parties, events, financials, rag_results, template_type
-            )
+            # Query RAG for relevant information (one batched, concurrent request) and draft the letter
+            draft = await draft_letter(case, template_type, additional_context)
             
             return {
-                "letter_content": letter_content,
+                "letter_content": draft["letter_content"],
                 "case_id": case_id,
                 "template_type": template_type,
-                "rag_context": rag_results,
+                "rag_context": draft["rag_context"],
                 "generated_at": "2024-01-01T00:00:00Z"  # Would use datetime.now().isoformat()
             }
         finally:
@@ -647,6 +727,49 @@ async def generate_demand_letter(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/demand_letters/batch", tags=["Document Generation"], summary="Generate demand letters in bulk", description="Generate demand letters for a list of cases or every case with a given status, returned as a streamed zip of PDFs or as one background job per case")
+async def generate_demand_letters_batch(request: Request):
+    """Generate demand letters for many cases in one request"""
+    body = await request.json()
+    case_ids = body.get("case_ids")
+    status = body.get("status")
+    template_type = body.get("template_type", "demand_letter")
+    additional_context = body.get("additional_context") or {}
+    output = body.get("output", "zip")
+    
+    if not case_ids and not status:
+        raise HTTPException(status_code=400, detail="case_ids or status is required")
+    if case_ids is not None and (not isinstance(case_ids, list) or not all(isinstance(case_id, str) for case_id in case_ids)):
+        raise HTTPException(status_code=400, detail="case_ids must be a list of strings")
+    if status is not None and not isinstance(status, str):
+        raise HTTPException(status_code=400, detail="status must be a string")
+    if output not in ("zip", "jobs"):
+        raise HTTPException(status_code=400, detail="output must be zip or jobs")
+    
+    # Every case and its details in a few bulk queries
+    with db.SessionLocal() as db_session:
+        cases = load_cases(db_session, case_ids, status)
+    found = {case.case_id for case in cases}
+    missing_case_ids = [case_id for case_id in dict.fromkeys(case_ids or []) if case_id not in found]
+    if not cases:
+        raise HTTPException(status_code=404, detail="No matching cases found")
+    
+    if output == "jobs":
+        jobs = []
+        for case in cases:
+            params = {"template_type": template_type, "additional_context": additional_context}
+            job = Job("demand_letter", case.case_id, params, [])
+            job_queue.submit(job, lambda job, case=case: run_letter_job(job, case, template_type, additional_context))
+            jobs.append({"case_id": case.case_id, "job_id": job.job_id, "status": job.status})
+        return {"jobs": jobs, "missing_case_ids": missing_case_ids}
+    
+    archive_name = f"demand_letters_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_letters_zip(cases, missing_case_ids, template_type, additional_context),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{archive_name}"'}
+    )
+
 @app.get("/mcp/tools", tags=["MCP"], summary="Get MCP tools", description="Get available MCP (Model Context Protocol) tools")
 async def get_mcp_tools():
     """Return available MCP tools"""
@@ -660,7 +783,8 @@ async def get_mcp_tools():
                     "properties": {
                         "query": {"type": "string", "description": "Natural language query"},
                         "case_id": {"type": "string", "description": "Case identifier"},
-                        "context": {"type": "object", "description": "Additional context"}
+                        "context": {"type": "object", "description": "Additional context"},
+                        "stream": {"type": "boolean", "description": "Stream the answer as server-sent events (sources, then tokens)"}
                     },
                     "required": ["query", "case_id"]
                 }
@@ -766,6 +890,11 @@ async def mcp_query(
             if not query or not case_id:
                 raise HTTPException(status_code=400, detail="Query and case_id are required")
             
+            # "stream": true answers with server-sent events instead
+            rag_engine = await aget_rag_engine()
+            if params.get("stream"):
+                return sse_response(rag_engine.query_stream(query, case_id, context), case_id=case_id, query=query)
+            
             response = await rag_engine.query(query, case_id, context)
             return {
                 "result": {
@@ -781,48 +910,11 @@ async def mcp_query(
             if not case_id:
                 raise HTTPException(status_code=400, detail="case_id is required")
             
-            case = db.query(models.Case).filter(models.Case.case_id == case_id).first()
+            case = load_case(db, case_id)
             if not case:
                 raise HTTPException(status_code=404, detail=f"Case {case_id} not found")
             
-            parties = db.query(models.Party).filter(models.Party.case_id == case_id).all()
-            events = db.query(models.TimelineEvent).filter(models.TimelineEvent.case_id == case_id).all()
-            financials = db.query(models.FinancialRecord).filter(models.FinancialRecord.case_id == case_id).all()
-            
-            return {
-                "result": {
-                    "case": {
-                        "case_id": case.case_id,
-                        "case_type": case.case_type,
-                        "date_filed": case.date_filed.isoformat() if case.date_filed else None,
-                        "status": case.status,
-                        "case_summary": case.case_summary
-                    },
-                    "parties": [
-                        {
-                            "party_id": p.party_id,
-                            "party_type": p.party_type,
-                            "name": p.name,
-                            "contact_info": p.contact_info
-                        } for p in parties
-                    ],
-                    "events": [
-                        {
-                            "event_id": e.event_id,
-                            "event_date": e.event_date.isoformat() if e.event_date else None,
-                            "description": e.description
-                        } for e in events
-                    ],
-                    "financials": [
-                        {
-                            "record_id": f.record_id,
-                            "record_type": f.record_type,
-                            "amount": f.amount,
-                            "description": f.description
-                        } for f in financials
-                    ]
-                }
-            }
+            return {"result": serialize_case_context(case)}
         else:
             raise HTTPException(status_code=400, detail=f"Unknown method: {method}")
     except Exception as e:
@@ -856,149 +948,21 @@ async def generate_pdf_json(request: Request):
 
 async def _generate_pdf_internal(letter_content: str, case_id: str):
     """Internal function to generate PDF"""
+    from .pdf_render import render_demand_letter_pdf, demand_letter_filename
+    
     try:
-        # Create PDF file
-        pdf_filename = f"demand_letter_{case_id}.pdf"
-        pdf_path = f"temp_{pdf_filename}"
-        
-        # Create the PDF document
-        doc = SimpleDocTemplate(pdf_path, pagesize=letter)
-        styles = getSampleStyleSheet()
-        
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=20,
-            alignment=1  # Center alignment
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=12,
-            leftIndent=0
-        )
-        
-        # Build the PDF content
-        story = []
-        
-        # Add title
-        story.append(Paragraph("DEMAND LETTER", title_style))
-        story.append(Spacer(1, 20))
-        
-        # Split content into paragraphs and add to story
-        paragraphs = letter_content.split('\n\n')
-        for paragraph in paragraphs:
-            if paragraph.strip():
-                # Handle special formatting for headers
-                if paragraph.strip().startswith('[') and paragraph.strip().endswith(']'):
-                    # This is a header like [LAW FIRM LETTERHEAD]
-                    story.append(Paragraph(paragraph.strip(), normal_style))
-                elif paragraph.strip().startswith('Re:') or paragraph.strip().startswith('Dear'):
-                    # This is a formal address
-                    story.append(Paragraph(paragraph.strip(), normal_style))
-                elif paragraph.strip().startswith('BASED ON OUR ANALYSIS') or paragraph.strip().startswith('LIABILITY EVIDENCE') or paragraph.strip().startswith('DETAILED BREAKDOWN'):
-                    # This is a section header
-                    header_style = ParagraphStyle(
-                        'SectionHeader',
-                        parent=styles['Heading2'],
-                        fontSize=14,
-                        spaceAfter=10,
-                        spaceBefore=15
-                    )
-                    story.append(Paragraph(paragraph.strip(), header_style))
-                else:
-                    # Regular paragraph
-                    story.append(Paragraph(paragraph.strip(), normal_style))
-        
-        # Build the PDF
-        doc.build(story)
-        
-        # Read the PDF file and return as bytes
-        with open(pdf_path, 'rb') as f:
-            pdf_bytes = f.read()
-        
-        # Clean up the temporary file
-        try:
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
-        except:
-            pass
-        
-        # Return PDF as bytes with proper headers
-        from fastapi.responses import Response
-        return Response(
-            content=pdf_bytes,
-            media_type='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename="{pdf_filename}"'
-            }
-        )
-        
+        # Rendered in memory, off the event loop
+        pdf_bytes = await asyncio.to_thread(render_demand_letter_pdf, letter_content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate PDF: {str(e)}")
-
-async def _generate_letter_content(case, parties, events, financials, rag_results, template_type):
-    """Generate letter content using RAG results and case data"""
-    from datetime import datetime
-    
-    # Extract key information from RAG results
-    medical_info = rag_results.get("Summarize medical expenses and treatment details", "")
-    lost_wages_info = rag_results.get("Calculate lost wages and income impact", "")
-    pain_suffering_info = rag_results.get("Assess pain and suffering factors", "")
-    liability_info = rag_results.get("Identify liability and negligence evidence", "")
-    
-    # Calculate totals from financial records
-    medical_total = sum(f.amount for f in financials if f.record_type == "medical")
-    lost_wages_total = sum(f.amount for f in financials if f.record_type == "lost_wages")
-    pain_suffering_total = sum(f.amount for f in financials if f.record_type == "pain_suffering")
     
-    # Find defendant and client
-    defendant = next((p for p in parties if p.party_type == "defendant"), None)
-    client = next((p for p in parties if p.party_type == "plaintiff"), None)
-    
-    # Generate letter content
-    letter_content = f"""
-[LAW FIRM LETTERHEAD]
-{datetime.now().strftime('%B %d, %Y')}
-
-{defendant.name if defendant else 'Defendant'}
-Attn: Claims Department
-
-Re: Demand for ${medical_total + lost_wages_total + pain_suffering_total:,} – Case {case.case_id}
-
-Dear Sir or Madam:
-
-On behalf of our client, {client.name if client else 'our client'}, we demand payment of ${medical_total + lost_wages_total + pain_suffering_total:,} for injuries sustained due to your insured's negligence.
-
-BASED ON OUR ANALYSIS OF THE CASE DOCUMENTS:
-
-{medical_info}
-
-{lost_wages_info}
-
-{pain_suffering_info}
-
-LIABILITY EVIDENCE:
-{liability_info}
-
-DETAILED BREAKDOWN:
-1. Medical Expenses: ${medical_total:,}
-2. Lost Wages: ${lost_wages_total:,}
-3. Pain & Suffering: ${pain_suffering_total:,}
-TOTAL DEMAND: ${medical_total + lost_wages_total + pain_suffering_total:,}
-
-Please remit payment within 30 days of this letter.
-
-Sincerely,
-
-[Attorney Name]
-    """
-    
-    return letter_content.strip()
+    return Response(
+        content=pdf_bytes,
+        media_type='application/pdf',
+        headers={
+            'Content-Disposition': f'attachment; filename="{demand_letter_filename(case_id)}"'
+        }
+    )
 
 if __name__ == "__main__":
     import uvicorn
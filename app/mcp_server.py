@@ -1,16 +1,21 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, Any, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from .db import get_db
-from .models import Case, Party, TimelineEvent, FinancialRecord
-from .rag_pipeline import LegalRAGEngine, LegalDocumentProcessor
+from .models import Case
+from .case_context import load_case, serialize_case_context
+from .demand_letters import draft_letter
+from .config import config
+from .engines import engine_warmup, aget_rag_engine, aget_doc_processor
 from .schemas import CaseDetails, PartyOut, EventOut
+from .streaming import sse_response
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,14 +33,23 @@ class MCPResponse(BaseModel):
 
 class LegalMCPServer:
     def __init__(self):
-        self.rag_engine = LegalRAGEngine()
-        self.doc_processor = LegalDocumentProcessor()
         self.app = FastAPI(title="Legal AI MCP Server")
         self._setup_routes()
     
     def _setup_routes(self):
         """Setup MCP-compatible API routes"""
         
+        @self.app.on_event("startup")
+        def start_engine_warmup():
+            if config.engine_warmup:
+                engine_warmup.start_background()
+        
+        @self.app.get("/health/ready")
+        def health_ready():
+            """Readiness probe: RAG engines created and embedding model loaded"""
+            status = engine_warmup.status()
+            return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+        
         @self.app.post("/mcp/query")
         async def mcp_query(request: MCPRequest, db: Session = Depends(get_db)):
             """Handle MCP-style queries with RAG integration"""
@@ -71,7 +85,8 @@ class LegalMCPServer:
                             "properties": {
                                 "query": {"type": "string", "description": "Natural language query"},
                                 "case_id": {"type": "string", "description": "Case identifier"},
-                                "context": {"type": "object", "description": "Additional context"}
+                                "context": {"type": "object", "description": "Additional context"},
+                                "stream": {"type": "boolean", "description": "Stream the answer as server-sent events (sources, then tokens)"}
                             },
                             "required": ["query", "case_id"]
                         }
@@ -129,8 +144,15 @@ class LegalMCPServer:
         if not case:
             raise ValueError(f"Case {case_id} not found")
         
+        # Shared engines are created on first use (see app/engines.py)
+        rag_engine = await aget_rag_engine()
+        
+        # "stream": true answers with server-sent events instead
+        if params.get("stream"):
+            return sse_response(rag_engine.query_stream(query, case_id, context), case_id=case_id, query=query)
+        
         # Query RAG engine
-        rag_response = await self.rag_engine.query(query, case_id, context)
+        rag_response = await rag_engine.query(query, case_id, context)
         
         return MCPResponse(
             result={
@@ -151,7 +173,8 @@ class LegalMCPServer:
             raise ValueError("file_path and case_id are required")
         
         # Process document using RAG pipeline
-        doc_result = await self.doc_processor.process_document(file_path, case_id)
+        doc_processor = await aget_doc_processor()
+        doc_result = await doc_processor.process_document(file_path, case_id)
         
         return MCPResponse(
             result={
@@ -173,31 +196,14 @@ class LegalMCPServer:
             raise ValueError("case_id is required")
         
         # Get case data
-        case = db.query(Case).filter(Case.case_id == case_id).first()
+        case = load_case(db, case_id)
         if not case:
             raise ValueError(f"Case {case_id} not found")
         
-        parties = db.query(Party).filter(Party.case_id == case_id).all()
-        events = db.query(TimelineEvent).filter(TimelineEvent.case_id == case_id).all()
-        financials = db.query(FinancialRecord).filter(FinancialRecord.case_id == case_id).all()
-        
-        # Query RAG for relevant information
-        rag_queries = [
-            "Summarize medical expenses and treatment details",
-            "Calculate lost wages and income impact",
-            "Assess pain and suffering factors",
-            "Identify liability and negligence evidence"
-        ]
-        
-        rag_results = {}
-        for query in rag_queries:
-            response = await self.rag_engine.query(query, case_id, additional_context)
-            rag_results[query] = response.answer
-        
-        # Generate letter content using RAG results
-        letter_content = await self._generate_letter_content(
-            case, parties, events, financials, rag_results, template_type
-        )
+        # Answer the demand letter sub-queries (one batched, concurrent request) and draft the letter
+        draft = await draft_letter(case, template_type, additional_context)
+        letter_content = draft["letter_content"]
+        rag_results = draft["rag_context"]
         
         return MCPResponse(
             result={
@@ -216,16 +222,13 @@ class LegalMCPServer:
         if not case_id:
             raise ValueError("case_id is required")
         
-        case = db.query(Case).filter(Case.case_id == case_id).first()
+        case = load_case(db, case_id)
         if not case:
             raise ValueError(f"Case {case_id} not found")
         
-        parties = db.query(Party).filter(Party.case_id == case_id).all()
-        events = db.query(TimelineEvent).filter(TimelineEvent.case_id == case_id).all()
-        financials = db.query(FinancialRecord).filter(FinancialRecord.case_id == case_id).all()
-        
         # Get RAG context
-        rag_context = await self.rag_engine.query(
+        rag_engine = await aget_rag_engine()
+        rag_context = await rag_engine.query(
             "Provide comprehensive case summary and key facts", 
             case_id, 
             {}
@@ -233,106 +236,11 @@ class LegalMCPServer:
         
         return MCPResponse(
             result={
-                "case": {
-                    "case_id": case.case_id,
-                    "case_type": case.case_type,
-                    "date_filed": case.date_filed.isoformat() if case.date_filed else None,
-                    "status": case.status,
-                    "case_summary": case.case_summary
-                },
-                "parties": [
-                    {
-                        "party_id": p.party_id,
-                        "party_type": p.party_type,
-                        "name": p.name,
-                        "contact_info": p.contact_info
-                    } for p in parties
-                ],
-                "events": [
-                    {
-                        "event_id": e.event_id,
-                        "event_date": e.event_date.isoformat() if e.event_date else None,
-                        "description": e.description
-                    } for e in events
-                ],
-                "financials": [
-                    {
-                        "record_id": f.record_id,
-                        "record_type": f.record_type,
-                        "amount": f.amount,
-                        "description": f.description
-                    } for f in financials
-                ],
+                **serialize_case_context(case),
                 "rag_summary": rag_context.answer,
                 "rag_sources": rag_context.sources
             }
         )
-    
-    async def _generate_letter_content(
-        self, 
-        case: Case, 
-        parties: List[Party], 
-        events: List[TimelineEvent], 
-        financials: List[FinancialRecord],
-        rag_results: Dict[str, str],
-        template_type: str
-    ) -> str:
-        """Generate letter content using RAG results and case data"""
-        
-        # Extract key information from RAG results
-        medical_info = rag_results.get("Summarize medical expenses and treatment details", "")
-        lost_wages_info = rag_results.get("Calculate lost wages and income impact", "")
-        pain_suffering_info = rag_results.get("Assess pain and suffering factors", "")
-        liability_info = rag_results.get("Identify liability and negligence evidence", "")
-        
-        # Calculate totals from financial records
-        medical_total = sum(f.amount for f in financials if f.record_type == "medical")
-        lost_wages_total = sum(f.amount for f in financials if f.record_type == "lost_wages")
-        pain_suffering_total = sum(f.amount for f in financials if f.record_type == "pain_suffering")
-        
-        # Find defendant (assuming first party that's not the client)
-        defendant = next((p for p in parties if p.party_type == "defendant"), None)
-        client = next((p for p in parties if p.party_type == "plaintiff"), None)
-        
-        # Generate letter content
-        letter_content = f"""
-[LAW FIRM LETTERHEAD]
-{datetime.now().strftime('%B %d, %Y')}
-
-{defendant.name if defendant else 'Defendant'}
-Attn: Claims Department
-
-Re: Demand for ${medical_total + lost_wages_total + pain_suffering_total:,} – Case {case.case_id}
-
-Dear Sir or Madam:
-
-On behalf of our client, {client.name if client else 'our client'}, we demand payment of ${medical_total + lost_wages_total + pain_suffering_total:,} for injuries sustained due to your insured's negligence.
-
-BASED ON OUR ANALYSIS OF THE CASE DOCUMENTS:
-
-{medical_info}
-
-{lost_wages_info}
-
-{pain_suffering_info}
-
-LIABILITY EVIDENCE:
-{liability_info}
-
-DETAILED BREAKDOWN:
-1. Medical Expenses: ${medical_total:,}
-2. Lost Wages: ${lost_wages_total:,}
-3. Pain & Suffering: ${pain_suffering_total:,}
-TOTAL DEMAND: ${medical_total + lost_wages_total + pain_suffering_total:,}
-
-Please remit payment within 30 days of this letter.
-
-Sincerely,
-
-[Attorney Name]
-        """
-        
-        return letter_content.strip()
 
 # Create MCP server instance
 mcp_server = LegalMCPServer()
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, ForeignKey
+from sqlalchemy.orm import relationship
 from .db import Base
 
 class Case(Base):
@@ -10,25 +11,87 @@ class Case(Base):
     attorney_id = Column(Integer)
     case_summary = Column(Text)
 
+    parties = relationship("Party", back_populates="case", order_by="Party.party_id")
+    events = relationship("TimelineEvent", back_populates="case", order_by="TimelineEvent.event_id")
+    financials = relationship("FinancialRecord", back_populates="case", order_by="FinancialRecord.record_id")
+
 class Party(Base):
     __tablename__ = "parties"
     party_id = Column(Integer, primary_key=True, index=True)
-    case_id = Column(String, ForeignKey("cases.case_id"))
+    case_id = Column(String, ForeignKey("cases.case_id"), index=True)
     party_type = Column(String)
     name = Column(String)
     contact_info = Column(String)
 
+    case = relationship("Case", back_populates="parties")
+
 class TimelineEvent(Base):
     __tablename__ = "timeline_events"
     event_id = Column(Integer, primary_key=True, index=True)
-    case_id = Column(String, ForeignKey("cases.case_id"))
+    case_id = Column(String, ForeignKey("cases.case_id"), index=True)
     event_date = Column(Date)
     description = Column(Text)
 
+    case = relationship("Case", back_populates="events")
+
 class FinancialRecord(Base):
     __tablename__ = "financial_records"
     record_id = Column(Integer, primary_key=True, index=True)
-    case_id = Column(String, ForeignKey("cases.case_id"))
+    case_id = Column(String, ForeignKey("cases.case_id"), index=True)
     record_type = Column(String)
     amount = Column(Integer)
     description = Column(Text)
+
+    case = relationship("Case", back_populates="financials")
+
+class CaseStats(Base):
+    """Materialized per-case counts and amounts, maintained by app.case_stats"""
+    __tablename__ = "case_stats"
+    # No foreign key: stats rows are removed after the case itself is deleted
+    case_id = Column(String, primary_key=True, index=True)
+    status = Column(String, index=True)
+    parties_count = Column(Integer, default=0)
+    events_count = Column(Integer, default=0)
+    financials_count = Column(Integer, default=0)
+    total_amount = Column(Integer, default=0)
+    updated_at = Column(DateTime)
+
+class SystemStats(Base):
+    """Global rollup of case_stats, one row per case status"""
+    __tablename__ = "system_stats"
+    status = Column(String, primary_key=True)
+    cases_count = Column(Integer, default=0)
+    parties_count = Column(Integer, default=0)
+    events_count = Column(Integer, default=0)
+    financials_count = Column(Integer, default=0)
+    total_amount = Column(Integer, default=0)
+
+class DocumentChunk(Base):
+    """A chunk of an ingested document, used to deduplicate re-ingestion"""
+    __tablename__ = "document_chunks"
+    # "<case_id>:<document hash prefix>_<offset>", unique across cases
+    chunk_id = Column(String, primary_key=True)
+    case_id = Column(String, index=True)
+    document_hash = Column(String(64), index=True)
+    document_name = Column(String)
+    chunk_index = Column(Integer)
+    content_hash = Column(String(64), index=True)
+    # ID of the vector holding this content (another chunk's when deduplicated)
+    vector_id = Column(String, index=True)
+    # Source location within the original PDF
+    page_number = Column(Integer)
+    page_end = Column(Integer)
+    start_offset = Column(Integer)
+    end_offset = Column(Integer)
+    section_heading = Column(String)
+    content = Column(Text)
+    created_at = Column(DateTime)
+
+class IngestedDocument(Base):
+    """A document whose chunks were all stored; partially ingested documents have no row"""
+    __tablename__ = "ingested_documents"
+    case_id = Column(String, primary_key=True)
+    document_hash = Column(String(64), primary_key=True)
+    document_name = Column(String, index=True)
+    chunks_count = Column(Integer)
+    ingested_at = Column(DateTime)
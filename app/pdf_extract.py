@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, List, Optional
+import fitz  # PyMuPDF
+from .config import config
+
+# Kept free of LangChain/SQLAlchemy imports so worker processes start quickly.
+
+_extract_pool: Optional[ProcessPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """Shared process pool for PyMuPDF text extraction"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(max_workers=config.ingest_extract_workers)
+        return _extract_pool
+
+def extract_pdf_text(file_path: str) -> str:
+    """Extract text from PDF with structure preservation"""
+    return "\n".join(iter_pdf_pages(file_path)).strip()
+
+def extract_pdf_pages(file_path: str) -> List[str]:
+    """Extract the text of every page, keeping page boundaries"""
+    return list(iter_pdf_pages(file_path))
+
+def pdf_page_count(file_path: str) -> int:
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+def iter_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each page in [start, stop) without holding the whole document"""
+    with fitz.open(file_path) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_number in range(start, stop):
+            # Use simple text extraction that works reliably
+            yield doc[page_number].get_text()
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Worker-process entry point: text of pages [start, stop)"""
+    return list(iter_pdf_pages(file_path, start, stop))
+
+async def stream_pdf_pages(
+    file_path: str,
+    pages_per_task: Optional[int] = None,
+    max_in_flight: Optional[int] = None
+) -> AsyncIterator[str]:
+    """Yield page texts in order, extracting page ranges in worker processes.
+
+    At most ``max_in_flight`` ranges are extracted ahead of the consumer,
+    so memory is bounded by ``pages_per_task * max_in_flight`` pages.
+    """
+    pages_per_task = pages_per_task or config.stream_extract_pages_per_task
+    max_in_flight = max_in_flight or config.stream_extract_max_in_flight
+    loop = asyncio.get_running_loop()
+    pool = get_extract_pool()
+    page_count = await loop.run_in_executor(None, pdf_page_count, file_path)
+
+    pending = deque()
+    for start in range(0, page_count, pages_per_task):
+        stop = min(start + pages_per_task, page_count)
+        pending.append(loop.run_in_executor(pool, extract_page_range, file_path, start, stop))
+        if len(pending) >= max_in_flight:
+            for page_text in await pending.popleft():
+                yield page_text
+    while pending:
+        for page_text in await pending.popleft():
+            yield page_text
@@ -0,0 +1,76 @@
+import io
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional
+from .config import config
+
+# Demand letter PDF rendering.
+#
+# Letters are rendered straight into memory, so concurrent requests for the
+# same case never share a file. ReportLab is imported on the first render
+# (keeping API startup light) and the paragraph styles are built once per
+# process and reused by every render.
+
+SECTION_HEADERS = ("BASED ON OUR ANALYSIS", "LIABILITY EVIDENCE", "DETAILED BREAKDOWN")
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Shared process pool for rendering many letters at once (ReportLab holds the GIL)"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=config.pdf_render_workers)
+        return _render_pool
+
+@lru_cache(maxsize=1)
+def _styles() -> Dict[str, object]:
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            spaceAfter=20,
+            alignment=1  # Center alignment
+        ),
+        "normal": ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=12,
+            spaceAfter=12,
+            leftIndent=0
+        ),
+        "section": ParagraphStyle(
+            'SectionHeader',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=10,
+            spaceBefore=15
+        )
+    }
+
+def demand_letter_filename(case_id: str) -> str:
+    return f"demand_letter_{case_id}.pdf"
+
+def render_demand_letter_pdf(letter_content: str) -> bytes:
+    """Render letter text (paragraphs separated by blank lines) to PDF bytes"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    styles = _styles()
+    story = [Paragraph("DEMAND LETTER", styles["title"]), Spacer(1, 20)]
+    for paragraph in letter_content.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        # Section headers get their own style; letterhead, address and body text use the normal one
+        style = styles["section"] if paragraph.startswith(SECTION_HEADERS) else styles["normal"]
+        story.append(Paragraph(paragraph, style))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(story)
+    return buffer.getvalue()
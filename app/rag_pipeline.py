@@ -1,19 +1,28 @@
 import os
-import fitz  # PyMuPDF
-from typing import List, Dict, Optional, Any
+import asyncio
+import json
+import threading
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator
 from datetime import datetime
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains import RetrievalQA
 from langchain.docstore.document import Document
 from langchain.prompts import PromptTemplate
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from .models import Case, Party, TimelineEvent, FinancialRecord
+from .models import Case
 from .db import SessionLocal
+from .case_context import load_case, case_version, status_counts, total_financial_amount_all, summarize_cases
 from .config import config
-from .llm_factory import LLMFactory
+from .llm_executor import AsyncLLM
+from .embeddings import get_embeddings
+from .pdf_extract import extract_pdf_pages, pdf_page_count, stream_pdf_pages
+from .chunking import StreamingChunker, TextChunk, chunk_pages
+from .chunk_store import (
+    sha256_file, sha256_text, make_chunk_id, document_chunk_ids, stored_vector_ids,
+    remove_superseded_chunks, unreferenced_vector_ids, record_document_chunks, mark_document_ingested
+)
+from .vector_store import vector_store_cache, CaseVectorStore
+from .keyword_index import keyword_index_store, reciprocal_rank_fusion
+from .answer_cache import answer_cache
 
 # Legal document processing prompts
 LEGAL_ANALYSIS_PROMPT = """
@@ -43,6 +52,17 @@ Requirements:
 5. Include specific amounts and dates when available
 """
 
+# Characters of document text sent to the LLM for analysis
+ANALYSIS_TEXT_LIMIT = 2000
+
+# Sub-queries answered from case documents when drafting a demand letter
+DEMAND_LETTER_QUERIES = [
+    "Summarize medical expenses and treatment details",
+    "Calculate lost wages and income impact",
+    "Assess pain and suffering factors",
+    "Identify liability and negligence evidence"
+]
+
 class CaseDocument(BaseModel):
     id: str
     case_id: str
@@ -64,21 +84,46 @@ class LegalDocumentProcessor:
         if llm_config is None:
             llm_config = config.llm_config
         
-        self.llm = LLMFactory.create_llm(llm_config)
+        self.llm = AsyncLLM(llm_config)
         self.analysis_prompt = PromptTemplate(
             template=LEGAL_ANALYSIS_PROMPT,
             input_variables=["text"]
         )
+        # Guards ``seen`` maps shared by documents selected in parallel threads
+        self._select_lock = threading.Lock()
 
-    async def process_document(self, file_path: str, case_id: str) -> CaseDocument:
-        """Process a legal document with enhanced metadata extraction"""
-        text = self._extract_text(file_path)
+    async def process_document(
+        self,
+        file_path: str,
+        case_id: str,
+        document_name: Optional[str] = None,
+        llm_slots: Optional[asyncio.Semaphore] = None
+    ) -> CaseDocument:
+        """Process a legal document with enhanced metadata extraction.
+
+        File, database and embedding work runs in worker threads. When
+        ``llm_slots`` is given, a slot is held only for the analysis call.
+        """
+        document_name = document_name or os.path.basename(file_path)
+        document_hash = await asyncio.to_thread(sha256_file, file_path)
+        
+        # Unchanged documents are not extracted, analyzed or embedded again
+        existing = await asyncio.to_thread(self._find_ingested_document, case_id, document_hash)
+        if existing is not None:
+            return existing
+        
+        # Large PDFs are extracted, chunked and stored as a stream of pages
+        if await asyncio.to_thread(pdf_page_count, file_path) >= config.stream_extract_min_pages:
+            return await self._process_document_streaming(file_path, case_id, document_hash, document_name, llm_slots)
+        
+        pages = await asyncio.to_thread(self._extract_pages, file_path)
         
         # Analyze document structure and content
-        analysis = self._analyze_document(text)
+        analysis = await self._analyze_document("\n".join(pages), llm_slots)
         
         # Create semantic chunks based on legal document structure
-        chunks = self._create_legal_chunks(text, analysis)
+        chunks = await asyncio.to_thread(self._create_legal_chunks, pages, analysis, case_id, document_hash)
+        self._tag_chunks(chunks, document_hash, document_name)
         
         # Store chunks in vector database
         doc_id = await self._store_chunks(chunks, case_id)
@@ -90,18 +135,102 @@ class LegalDocumentProcessor:
             chunks=[chunk.id for chunk in chunks]
         )
 
-    def _extract_text(self, file_path: str) -> str:
-        """Extract text from PDF with structure preservation"""
-        text = ""
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                # Use simple text extraction that works reliably
-                text += page.get_text() + "\n"
-        return text.strip()
-
-    def _analyze_document(self, text: str) -> Dict:
-        """Analyze document content using LLM"""
-        analysis = self.llm.invoke(self.analysis_prompt.format(text=text[:2000]))  # Limit for analysis
+    async def _process_document_streaming(
+        self,
+        file_path: str,
+        case_id: str,
+        document_hash: str,
+        document_name: str,
+        llm_slots: Optional[asyncio.Semaphore] = None
+    ) -> CaseDocument:
+        """Process a large PDF page by page.
+
+        Page ranges are extracted in worker processes and fed to a
+        streaming chunker; finished chunks are embedded and stored as they
+        are produced, so only a window of pages is held in memory.
+        """
+        pages = stream_pdf_pages(file_path)
+        
+        # The analysis only looks at the beginning of the document
+        head = []
+        head_chars = 0
+        async for page_text in pages:
+            head.append(page_text + "\n")
+            head_chars += len(page_text)
+            if head_chars >= ANALYSIS_TEXT_LIMIT:
+                break
+        analysis = await self._analyze_document("".join(head), llm_slots)
+        
+        chunker = StreamingChunker(*self._chunk_params(analysis))
+        chunk_ids: List[str] = []
+        seen: Dict[str, str] = {}
+        
+        async def store(ready):
+            if not ready:
+                return
+            chunks = [
+                self._make_chunk(text_chunk, len(chunk_ids) + i, analysis, case_id, document_hash)
+                for i, text_chunk in enumerate(ready)
+            ]
+            self._tag_chunks(chunks, document_hash, document_name)
+            to_embed = await asyncio.to_thread(self._select_chunks_to_embed, case_id, chunks, seen)
+            await asyncio.to_thread(self._add_to_vector_store, to_embed, case_id)
+            await self._store_chunks_in_db(case_id, chunks)
+            chunk_ids.extend(chunk.id for chunk in chunks)
+        
+        for page_text in head:
+            await store(chunker.feed(page_text))
+        async for page_text in pages:
+            await store(chunker.feed(page_text + "\n"))
+        await store(chunker.flush())
+        await asyncio.to_thread(self._finish_document, case_id, document_name, document_hash, len(chunk_ids))
+        
+        return CaseDocument(
+            id=self._document_id(document_hash),
+            case_id=case_id,
+            metadata=analysis,
+            chunks=chunk_ids
+        )
+
+    def _find_ingested_document(self, case_id: str, document_hash: str) -> Optional[CaseDocument]:
+        """Return the stored document if this exact file was already ingested for the case"""
+        db = SessionLocal()
+        try:
+            chunk_ids = document_chunk_ids(db, case_id, document_hash)
+        finally:
+            db.close()
+        if not chunk_ids:
+            return None
+        return CaseDocument(
+            id=self._document_id(document_hash),
+            case_id=case_id,
+            metadata={"document_hash": document_hash, "deduplicated": True},
+            chunks=chunk_ids
+        )
+
+    def _tag_chunks(self, chunks: List[DocumentChunk], document_hash: str, document_name: str):
+        """Record the source document and content hash on each chunk"""
+        for chunk in chunks:
+            chunk.metadata["chunk_id"] = chunk.id
+            chunk.metadata["document_hash"] = document_hash
+            chunk.metadata["document_name"] = document_name
+            chunk.metadata["content_hash"] = sha256_text(chunk.text)
+
+    def _document_id(self, document_hash: str) -> str:
+        return f"doc_{document_hash[:16]}"
+
+    def _extract_pages(self, file_path: str) -> List[str]:
+        """Extract text from PDF, one entry per page"""
+        return extract_pdf_pages(file_path)
+
+    async def _analyze_document(self, text: str, llm_slots: Optional[asyncio.Semaphore] = None) -> Dict:
+        """Analyze document content using LLM, holding one of ``llm_slots`` if given"""
+        prompt = self.analysis_prompt.format(text=text[:ANALYSIS_TEXT_LIMIT])  # Limit for analysis
+        if llm_slots is None:
+            analysis = await self.llm.ainvoke(prompt)
+        else:
+            async with llm_slots:
+                analysis = await self.llm.ainvoke(prompt)
         return self._parse_analysis(analysis)
 
     def _parse_analysis(self, analysis: str) -> Dict:
@@ -116,9 +245,8 @@ class LegalDocumentProcessor:
             "liability_factors": []
         }
 
-    def _create_legal_chunks(self, text: str, analysis: Dict) -> List[DocumentChunk]:
-        """Create semantic chunks based on legal document structure"""
-        # Use custom chunking based on document type and structure
+    def _chunk_params(self, analysis: Dict) -> Tuple[int, int]:
+        """Chunk size and overlap based on document type and structure"""
         chunk_size = 1000
         overlap = 200
         
@@ -126,26 +254,35 @@ class LegalDocumentProcessor:
             chunk_size = 1500  # Larger chunks for briefs
         elif analysis.get("document_type") == "contract":
             chunk_size = 800   # Smaller chunks for contracts
-            
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=overlap,
-            separators=["\n\n", "\n", ".", " "]
+        return chunk_size, overlap
+
+    def _make_chunk(self, text_chunk: TextChunk, index: int, analysis: Dict, case_id: str, document_hash: str) -> DocumentChunk:
+        # Chunk IDs are derived from the case, the document hash and the chunk's
+        # offset, so they are unique across cases and documents and stable
+        # across re-ingestion
+        return DocumentChunk(
+            id=make_chunk_id(case_id, document_hash, text_chunk.start_offset),
+            text=text_chunk.text,
+            metadata={
+                "document_type": analysis.get("document_type", "legal_document"),
+                "parties": analysis.get("parties", []),
+                "citations": self._extract_citations(text_chunk.text),
+                "chunk_index": index,
+                "start_offset": text_chunk.start_offset,
+                "end_offset": text_chunk.end_offset,
+                "page_number": text_chunk.page_number,
+                "page_end": text_chunk.page_end,
+                "page_offset": text_chunk.page_offset,
+                "section_heading": text_chunk.section_heading
+            }
         )
-        
-        raw_chunks = splitter.split_text(text)
+
+    def _create_legal_chunks(self, pages: List[str], analysis: Dict, case_id: str, document_hash: Optional[str] = None) -> List[DocumentChunk]:
+        """Create page- and offset-aware chunks based on legal document structure"""
+        document_hash = document_hash or sha256_text("\n".join(pages))
         return [
-            DocumentChunk(
-                id=f"chunk_{i}",
-                text=chunk,
-                metadata={
-                    "document_type": analysis.get("document_type", "legal_document"),
-                    "parties": analysis.get("parties", []),
-                    "citations": self._extract_citations(chunk),
-                    "chunk_index": i
-                }
-            )
-            for i, chunk in enumerate(raw_chunks)
+            self._make_chunk(text_chunk, i, analysis, case_id, document_hash)
+            for i, text_chunk in enumerate(chunk_pages(pages, *self._chunk_params(analysis)))
         ]
 
     def _extract_citations(self, text: str) -> List[str]:
@@ -180,42 +317,116 @@ class LegalDocumentProcessor:
 
     async def _store_chunks(self, chunks: List[DocumentChunk], case_id: str) -> str:
         """Store document chunks in vector database"""
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        # Only chunks whose content is not embedded for this case yet
+        to_embed = await asyncio.to_thread(self._select_chunks_to_embed, case_id, chunks)
+        await asyncio.to_thread(self._add_to_vector_store, to_embed, case_id)
+        
+        # Store in SQL database for metadata querying
+        doc_id = await self._store_chunks_in_db(case_id, chunks)
+        if chunks:
+            metadata = chunks[0].metadata
+            await asyncio.to_thread(
+                self._finish_document, case_id, metadata.get("document_name"), metadata.get("document_hash"), len(chunks)
+            )
+        return doc_id
+
+    def _select_chunks_to_embed(
+        self,
+        case_id: str,
+        chunks: List[DocumentChunk],
+        seen: Optional[Dict[str, str]] = None,
+        embedded: Optional[Dict[str, str]] = None
+    ) -> List[DocumentChunk]:
+        """Return the chunks whose content is not embedded for the case yet.
+
+        Every chunk gets a ``vector_id``: its own ID when it will be embedded,
+        or the ID of the vector that already holds the same content, which
+        includes unchanged chunks of an earlier version of the document.
+        ``seen`` maps content hashes selected so far for the same document to
+        their vector IDs and is updated with this call's selections.
+        ``embedded`` maps content hashes to vectors other documents have
+        already written to the store; it is only read, so a document never
+        points at a vector whose write might still fail.
+        """
+        if not chunks:
+            return []
+        seen = {} if seen is None else seen
+        db = SessionLocal()
+        try:
+            stored = stored_vector_ids(db, case_id, (chunk.metadata["content_hash"] for chunk in chunks))
+        finally:
+            db.close()
+        
+        selected = []
+        with self._select_lock:
+            for chunk in chunks:
+                content_hash = chunk.metadata["content_hash"]
+                vector_id = stored.get(content_hash) or seen.get(content_hash) or (embedded or {}).get(content_hash)
+                if vector_id is None:
+                    vector_id = chunk.id
+                    seen[content_hash] = vector_id
+                    selected.append(chunk)
+                chunk.metadata["vector_id"] = vector_id
+        return selected
+
+    def _finish_document(self, case_id: str, document_name: Optional[str], document_hash: str, chunks_count: int):
+        """Mark a fully stored document as ingested and drop rows of its earlier versions.
+
+        Runs after every chunk row of the new version exists, so an ingest
+        that fails part-way is not mistaken for a complete one, vectors the
+        new version reuses stay referenced, and only vectors of truly stale
+        content are deleted.
+        """
+        db = SessionLocal()
+        try:
+            stale_vector_ids = remove_superseded_chunks(db, case_id, document_name, document_hash)
+            db.flush()
+            orphaned = unreferenced_vector_ids(db, case_id, stale_vector_ids)
+            mark_document_ingested(db, case_id, document_hash, document_name, chunks_count)
+            db.commit()
+        finally:
+            db.close()
+        self._delete_vectors(case_id, orphaned)
+        # The document is complete, so write its keyword index changes in one go
+        keyword_index_store.flush(case_id)
+
+    def _delete_vectors(self, case_id: str, vector_ids: List[str]):
+        """Remove vectors from the case's store by ID"""
+        if not vector_ids:
+            return
+        vectordb = vector_store_cache.get(case_id)
+        if vectordb is not None:
+            vectordb.delete(list(vector_ids))
+        answer_cache.invalidate(case_id)
+        keyword_index_store.update(case_id, remove=list(vector_ids))
+
+    def _add_to_vector_store(self, chunks: List[DocumentChunk], case_id: str):
+        """Embed chunks (possibly from several documents) and persist them to the case's vector store"""
+        if not chunks:
+            return
         texts = [chunk.text for chunk in chunks]
         metadatas = [self._clean_metadata(chunk.metadata) for chunk in chunks]
         
-        # Ensure directory exists
-        os.makedirs(os.path.join(config.chroma_dir, case_id), exist_ok=True)
+        vector_store_cache.open(case_id).add([chunk.id for chunk in chunks], texts, metadatas)
+        answer_cache.invalidate(case_id)
         
-        vectordb = Chroma.from_texts(
-            texts,
-            embeddings,
-            metadatas=metadatas,
-            persist_directory=os.path.join(config.chroma_dir, case_id)
+        # Keep the case's keyword index in step with the vector store
+        keyword_index_store.update(
+            case_id,
+            add=[(chunk.id, chunk.text, metadata) for chunk, metadata in zip(chunks, metadatas)]
         )
-        vectordb.persist()
-        
-        # Store in SQL database for metadata querying
-        doc_id = await self._store_chunks_in_db(case_id, chunks)
-        return doc_id
 
     async def _store_chunks_in_db(self, case_id: str, chunks: List[DocumentChunk]) -> str:
         """Store chunk metadata in SQL database"""
-        # This would typically store in a DocumentChunk table
-        # For now, return a simple ID
-        return f"doc_{case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return await store_document_chunks(case_id, chunks)
 
 class LegalRAGEngine:
     def __init__(self, llm_config=None):
         if llm_config is None:
             llm_config = config.llm_config
         
-        self.llm = LLMFactory.create_llm(llm_config)
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=config.embedding_model
-        )
+        self.llm = AsyncLLM(llm_config)
+        self.embeddings = get_embeddings()
         self.response_prompt = PromptTemplate(
             template=RESPONSE_GENERATION_PROMPT,
             input_variables=["query", "case_context", "documents"]
@@ -228,39 +439,32 @@ class LegalRAGEngine:
         if self._is_system_query(query):
             return await self._handle_system_query(query)
         
+        # Reuse a cached answer for this query and version of the case
+        scope, vector, cached = await self._cached_answer(query, case_id, context)
+        if cached is not None:
+            return cached
+        
         # Get case context from database
         case_context = await self._get_case_context(case_id)
         
-        # Check if vector store exists for this case
-        vector_store_path = os.path.join(config.chroma_dir, case_id)
-        print(f"🔍 Checking vector store path: {vector_store_path}")
-        print(f"🔍 Path exists: {os.path.exists(vector_store_path)}")
-        
-        if not os.path.exists(vector_store_path):
-            print(f"❌ Vector store not found for case {case_id}")
-            # No documents processed yet, return response based on case context only
-            return await self._generate_response_from_context_only(
-                query=query,
-                case_context=case_context,
-                user_context=context
-            )
-        
-        # Load case-specific vector store
+        # Load case-specific vector store (cached across queries)
         try:
-            vectordb = Chroma(
-                persist_directory=vector_store_path,
-                embedding_function=self.embeddings
-            )
+            vectordb = vector_store_cache.get(case_id)
+            
+            if vectordb is None:
+                print(f"❌ Vector store not found for case {case_id}")
+                # No documents processed yet, return response based on case context only
+                return await self._generate_response_from_context_only(
+                    query=query,
+                    case_context=case_context,
+                    user_context=context
+                )
             
             # Retrieve relevant chunks
-            retriever = vectordb.as_retriever(
-                search_type="mmr",
-                search_kwargs={
-                    "k": 5
-                }
-            )
             print(f"🔍 Retrieving documents for query: '{query}'")
-            relevant_chunks = retriever.get_relevant_documents(query)
+            if vector is None:
+                vector = await asyncio.to_thread(self.embeddings.embed_query, query)
+            relevant_chunks = await asyncio.to_thread(self._retrieve, vectordb, case_id, query, vector)
             print(f"🔍 Retrieved {len(relevant_chunks)} chunks")
             
             if len(relevant_chunks) > 0:
@@ -275,6 +479,7 @@ class LegalRAGEngine:
                 case_context=case_context,
                 user_context=context
             )
+            answer_cache.put(scope, query, response, vector)
             
             return response
         except Exception as e:
@@ -285,6 +490,224 @@ class LegalRAGEngine:
                 user_context=context
             )
 
+    async def query_stream(self, query: str, case_id: str, context: Dict) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of ``query`` yielding ``{"event", "data"}`` dicts.
+
+        Retrieved sources are sent first (``sources``), then the answer as it
+        is generated (``token``), then the complete answer (``done``).
+        Answers that are not generated by the LLM (system queries, cache
+        hits, cases without documents) arrive as a single token.
+        """
+        if self._is_system_query(query):
+            async for event in self._response_events(await self._handle_system_query(query)):
+                yield event
+            return
+        
+        scope, vector, cached = await self._cached_answer(query, case_id, context)
+        if cached is not None:
+            async for event in self._response_events(cached, cached=True):
+                yield event
+            return
+        
+        case_context = await self._get_case_context(case_id)
+        try:
+            vectordb = vector_store_cache.get(case_id)
+            relevant_chunks = None
+            if vectordb is not None:
+                if vector is None:
+                    vector = await asyncio.to_thread(self.embeddings.embed_query, query)
+                relevant_chunks = await asyncio.to_thread(self._retrieve, vectordb, case_id, query, vector)
+        except Exception as e:
+            print(f"❌ Retrieval failed for case {case_id}: {e}")
+            relevant_chunks = None
+        if relevant_chunks is None:
+            response = await self._generate_response_from_context_only(
+                query=query,
+                case_context=case_context,
+                user_context=context
+            )
+            async for event in self._response_events(response):
+                yield event
+            return
+        
+        prompt, formatted_context = self._build_prompt(query, relevant_chunks, case_context, context)
+        sources = [chunk.metadata for chunk in relevant_chunks]
+        yield {"event": "sources", "data": {"sources": sources, "context_used": formatted_context}}
+        
+        parts = []
+        try:
+            async for text in self.llm.astream(prompt):
+                parts.append(text)
+                yield {"event": "token", "data": {"text": text}}
+        except Exception as e:
+            yield {"event": "error", "data": {"detail": str(e)}}
+            return
+        
+        answer = "".join(parts)
+        answer_cache.put(scope, query, QueryResponse(answer=answer, sources=sources, context_used=formatted_context), vector)
+        yield {"event": "done", "data": {"answer": answer, "cached": False}}
+
+    async def _response_events(self, response: QueryResponse, cached: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """A complete response as stream events"""
+        yield {"event": "sources", "data": {"sources": response.sources, "context_used": response.context_used}}
+        yield {"event": "token", "data": {"text": response.answer}}
+        yield {"event": "done", "data": {"answer": response.answer, "cached": cached}}
+
+    async def query_many(
+        self,
+        queries: List[str],
+        case_id: str,
+        context: Dict,
+        case: Optional[Case] = None
+    ) -> Dict[str, QueryResponse]:
+        """Answer several queries about one case in a single batch.
+
+        Case context and the vector store are loaded once, all query
+        embeddings are computed together, and LLM generation runs
+        concurrently (bounded by ``config.rag_query_concurrency``).
+        Callers that already loaded the case (e.g. batch letter
+        generation) pass it in to skip the database lookup.
+        """
+        responses: Dict[str, QueryResponse] = {}
+        for query in queries:
+            if self._is_system_query(query):
+                responses[query] = await self._handle_system_query(query)
+        case_queries = [query for query in dict.fromkeys(queries) if query not in responses]
+        
+        # Answer what we can from the cache
+        scope = await self._cache_scope(case_id, context) if answer_cache.enabled else None
+        vectors: Dict[str, List[float]] = {}
+        for query in case_queries:
+            cached = answer_cache.get(scope, query)
+            if cached is not None:
+                responses[query] = cached
+        case_queries = [query for query in case_queries if query not in responses]
+        if case_queries and answer_cache.enabled and answer_cache.similarity > 0:
+            embedded = await asyncio.to_thread(self.embeddings.embed_documents, case_queries)
+            vectors = dict(zip(case_queries, embedded))
+            for query in case_queries:
+                cached = answer_cache.get(scope, query, vectors[query])
+                if cached is not None:
+                    responses[query] = cached
+            case_queries = [query for query in case_queries if query not in responses]
+        if not case_queries:
+            return {query: responses[query] for query in queries}
+        
+        case_context = self.case_context(case) if case is not None else await self._get_case_context(case_id)
+        
+        try:
+            vectordb = vector_store_cache.get(case_id)
+            if vectordb is None:
+                print(f"❌ Vector store not found for case {case_id}")
+                chunk_lists = None
+            else:
+                # One embedding batch for every sub-query, then search by vector
+                missing = [query for query in case_queries if query not in vectors]
+                if missing:
+                    embedded = await asyncio.to_thread(self.embeddings.embed_documents, missing)
+                    vectors.update(zip(missing, embedded))
+                chunk_lists = await asyncio.to_thread(lambda: [
+                    self._retrieve(vectordb, case_id, query, vectors[query])
+                    for query in case_queries
+                ])
+        except Exception as e:
+            print(f"❌ Batch retrieval failed for case {case_id}: {e}")
+            chunk_lists = None
+        
+        slots = asyncio.Semaphore(config.rag_query_concurrency)
+        
+        async def answer(query: str, chunks: Optional[List[Document]]) -> QueryResponse:
+            async with slots:
+                if chunks is not None:
+                    try:
+                        response = await self._generate_response(
+                            query=query,
+                            chunks=chunks,
+                            case_context=case_context,
+                            user_context=context
+                        )
+                        answer_cache.put(scope, query, response, vectors.get(query))
+                        return response
+                    except Exception:
+                        pass
+                # Fallback to context-only response
+                return await self._generate_response_from_context_only(
+                    query=query,
+                    case_context=case_context,
+                    user_context=context
+                )
+        
+        answers = await asyncio.gather(*(
+            answer(query, chunk_lists[i] if chunk_lists is not None else None)
+            for i, query in enumerate(case_queries)
+        ))
+        responses.update(zip(case_queries, answers))
+        return {query: responses[query] for query in queries}
+
+    async def _cached_answer(self, query: str, case_id: str, context: Dict) -> Tuple[Optional[Tuple], Optional[List[float]], Optional[QueryResponse]]:
+        """(cache scope, query vector if computed, cached answer or None)"""
+        scope = await self._cache_scope(case_id, context) if answer_cache.enabled else None
+        vector = None
+        cached = answer_cache.get(scope, query)
+        if cached is None and answer_cache.enabled and answer_cache.similarity > 0:
+            vector = await asyncio.to_thread(self.embeddings.embed_query, query)
+            cached = answer_cache.get(scope, query, vector)
+        if cached is not None:
+            print(f"♻️ Answer cache hit for query: '{query}'")
+        return scope, vector, cached
+
+    async def _cache_scope(self, case_id: str, context: Dict) -> Tuple:
+        """Answer cache scope: case, LLM configuration, user context and case version"""
+        def stamp():
+            db = SessionLocal()
+            try:
+                return case_version(db, case_id)
+            finally:
+                db.close()
+        llm_config = self.llm.config
+        return (
+            case_id,
+            (llm_config.provider, llm_config.model, llm_config.base_url, llm_config.temperature),
+            json.dumps(context or {}, sort_keys=True, default=str),
+            await asyncio.to_thread(stamp),
+            keyword_index_store.modified_at(case_id)
+        )
+
+    async def search_all(self, query: str, k: Optional[int] = None) -> List[Document]:
+        """Firm-wide retrieval across every case (requires sharded vector storage)"""
+        vector = await asyncio.to_thread(self.embeddings.embed_query, query)
+        return await asyncio.to_thread(vector_store_cache.search_all, vector, k or config.rag_top_k)
+
+    def _retrieve(self, vectordb: CaseVectorStore, case_id: str, query: str, vector: List[float]) -> List[Document]:
+        """Retrieve the top chunks for a query.
+
+        When the case has a keyword index, vector similarity hits and BM25
+        keyword hits are fused with reciprocal-rank fusion, so exact
+        identifiers (claim numbers, CPT codes, amounts) are found even when
+        they are semantically unremarkable. Otherwise falls back to MMR.
+        """
+        top_k = config.rag_top_k
+        keyword_index = keyword_index_store.get(case_id) if config.hybrid_retrieval else None
+        if keyword_index is None:
+            return vectordb.max_marginal_relevance_search_by_vector(vector, k=top_k)
+        
+        candidates = max(config.rag_candidate_k, top_k)
+        documents: Dict[str, Document] = {}
+        vector_ranking = []
+        # Both rankings are keyed by vector store ID, which stores from before
+        # chunk IDs (and keyword indexes rebuilt from them) also share
+        for doc_id, doc in vectordb.similarity_search_with_ids(vector, k=candidates):
+            documents.setdefault(doc_id, doc)
+            vector_ranking.append(doc_id)
+        keyword_ranking = []
+        for doc_id, _ in keyword_index.search(query, candidates):
+            if doc_id not in documents:
+                documents[doc_id] = keyword_index.document(doc_id)
+            keyword_ranking.append(doc_id)
+        
+        fused = reciprocal_rank_fusion([vector_ranking, keyword_ranking], k=config.rrf_k)
+        return [documents[doc_id] for doc_id in fused[:top_k]]
+
     async def _generate_response_from_context_only(
         self,
         query: str,
@@ -352,56 +775,29 @@ Note: No legal documents have been processed for this case yet. The response is
         query_lower = query.lower()
         return any(keyword in query_lower for keyword in system_keywords)
 
-    async def _handle_system_query(self, query: str) -> QueryResponse:
+    async def system_query(self, query: str, cases: Optional[List[Case]] = None) -> QueryResponse:
+        """Answer a system-wide query, reusing ``cases`` if they are already eager-loaded"""
+        return await self._handle_system_query(query, cases)
+
+    async def _handle_system_query(self, query: str, cases: Optional[List[Case]] = None) -> QueryResponse:
         """Handle system-wide queries about cases"""
         try:
             db = SessionLocal()
             
-            # Get all cases with detailed information
-            cases = db.query(Case).all()
-            
-            # Get detailed case information including parties, events, and financials
-            detailed_cases = []
-            for case in cases:
-                parties = db.query(Party).filter(Party.case_id == case.case_id).all()
-                events = db.query(TimelineEvent).filter(TimelineEvent.case_id == case.case_id).all()
-                financials = db.query(FinancialRecord).filter(FinancialRecord.case_id == case.case_id).all()
-                
-                # Calculate total financial amount
-                total_amount = sum(f.amount for f in financials) if financials else 0
-                
-                # Get timeline events with dates
-                timeline_events = []
-                for event in events:
-                    timeline_events.append({
-                        'date': event.event_date.strftime('%Y-%m-%d') if event.event_date else 'Unknown',
-                        'description': event.description
-                    })
-                
-                detailed_cases.append({
-                    'case_id': case.case_id,
-                    'case_type': case.case_type,
-                    'status': case.status,
-                    'date_filed': case.date_filed.strftime('%Y-%m-%d') if case.date_filed else 'Unknown',
-                    'summary': case.case_summary,
-                    'parties_count': len(parties),
-                    'events_count': len(events),
-                    'financials_count': len(financials),
-                    'total_amount': total_amount,
-                    'parties': [{'type': p.party_type, 'name': p.name} for p in parties],
-                    'recent_events': [e.description for e in events[-3:]] if events else [],
-                    'timeline_events': timeline_events,
-                    'financial_summary': f"${total_amount:,}" if total_amount > 0 else "No financial records"
-                })
+            # Case statistics come from GROUP BY aggregates rather than per-case queries
+            statuses = status_counts(db)
+            total_cases = sum(statuses.values())
+            active_cases = statuses.get('Active', 0)
+            pending_cases = active_cases + statuses.get('Pending', 0)
+            total_financial_amount = total_financial_amount_all(db)
             
-            # Get case statistics
-            total_cases = len(cases)
-            active_cases = len([c for c in cases if c.status == 'Active'])
-            pending_cases = len([c for c in cases if c.status in ['Active', 'Pending']])
-            total_financial_amount = sum(c['total_amount'] for c in detailed_cases)
+            # Case rows are only needed for the listing variants, parties and events only for the detailed ones
+            is_count_query = 'number' in query.lower() or 'count' in query.lower() or 'total' in query.lower()
+            needs_details = any(word in query.lower() for word in ('dates', 'timeline', 'events', 'details', 'comprehensive'))
+            detailed_cases = [] if is_count_query else summarize_cases(db, cases, details=needs_details)
             
             # Generate response based on query type
-            if 'number' in query.lower() or 'count' in query.lower() or 'total' in query.lower():
+            if is_count_query:
                 response_text = f"""
 **Case System Overview**
 
@@ -412,9 +808,9 @@ Note: No legal documents have been processed for this case yet. The response is
 
 **Case Breakdown by Status:**
 - Active: {active_cases} cases
-- Pending: {len([c for c in cases if c.status == 'Pending'])} cases
-- Closed: {len([c for c in cases if c.status == 'Closed'])} cases
-- Other: {len([c for c in cases if c.status not in ['Active', 'Pending', 'Closed']])} cases
+- Pending: {statuses.get('Pending', 0)} cases
+- Closed: {statuses.get('Closed', 0)} cases
+- Other: {total_cases - active_cases - statuses.get('Pending', 0) - statuses.get('Closed', 0)} cases
                 """
             elif 'dates' in query.lower() or 'timeline' in query.lower() or 'events' in query.lower():
                 # Show case details with focus on dates and timeline
@@ -527,45 +923,43 @@ Note: No legal documents have been processed for this case yet. The response is
         """Get case context from database"""
         db = SessionLocal()
         try:
-            case = db.query(Case).filter(Case.case_id == case_id).first()
-            if not case:
-                return {}
-            
-            parties = db.query(Party).filter(Party.case_id == case_id).all()
-            events = db.query(TimelineEvent).filter(TimelineEvent.case_id == case_id).all()
-            financials = db.query(FinancialRecord).filter(FinancialRecord.case_id == case_id).all()
-            
-            return {
-                "case": {
-                    "case_id": case.case_id,
-                    "case_type": case.case_type,
-                    "status": case.status,
-                    "case_summary": case.case_summary
-                },
-                "parties": [
-                    {
-                        "party_type": p.party_type,
-                        "name": p.name,
-                        "contact_info": p.contact_info
-                    } for p in parties
-                ],
-                "events": [
-                    {
-                        "event_date": e.event_date.isoformat() if e.event_date else None,
-                        "description": e.description
-                    } for e in events
-                ],
-                "financials": [
-                    {
-                        "record_type": f.record_type,
-                        "amount": f.amount,
-                        "description": f.description
-                    } for f in financials
-                ]
-            }
+            case = load_case(db, case_id)
+            return self.case_context(case) if case else {}
         finally:
             db.close()
 
+    @staticmethod
+    def case_context(case: Case) -> Dict[str, Any]:
+        """Prompt context for an eager-loaded case"""
+        return {
+            "case": {
+                "case_id": case.case_id,
+                "case_type": case.case_type,
+                "status": case.status,
+                "case_summary": case.case_summary
+            },
+            "parties": [
+                {
+                    "party_type": p.party_type,
+                    "name": p.name,
+                    "contact_info": p.contact_info
+                } for p in case.parties
+            ],
+            "events": [
+                {
+                    "event_date": e.event_date.isoformat() if e.event_date else None,
+                    "description": e.description
+                } for e in case.events
+            ],
+            "financials": [
+                {
+                    "record_type": f.record_type,
+                    "amount": f.amount,
+                    "description": f.description
+                } for f in case.financials
+            ]
+        }
+
     async def _generate_response(
         self,
         query: str,
@@ -574,18 +968,10 @@ Note: No legal documents have been processed for this case yet. The response is
         user_context: Dict
     ) -> QueryResponse:
         """Generate response with citations and context"""
-        # Format chunks and context for prompt
-        formatted_chunks = self._format_chunks_for_prompt(chunks)
-        formatted_context = self._format_context(case_context, user_context)
+        prompt, formatted_context = self._build_prompt(query, chunks, case_context, user_context)
         
         # Generate response using LLM
-        response_text = self.llm.invoke(
-            self.response_prompt.format(
-                query=query,
-                case_context=formatted_context,
-                documents=formatted_chunks
-            )
-        )
+        response_text = await self.llm.ainvoke(prompt)
         
         return QueryResponse(
             answer=response_text,
@@ -593,13 +979,38 @@ Note: No legal documents have been processed for this case yet. The response is
             context_used=formatted_context
         )
 
+    def _build_prompt(self, query: str, chunks: List[Document], case_context: Dict, user_context: Dict) -> Tuple[str, Dict[str, Any]]:
+        """Response prompt for the retrieved chunks, and the formatted context it uses"""
+        formatted_context = self._format_context(case_context, user_context)
+        prompt = self.response_prompt.format(
+            query=query,
+            case_context=formatted_context,
+            documents=self._format_chunks_for_prompt(chunks)
+        )
+        return prompt, formatted_context
+
     def _format_chunks_for_prompt(self, chunks: List[Document]) -> str:
         """Format chunks for prompt input"""
         formatted = []
         for i, chunk in enumerate(chunks):
-            formatted.append(f"Document {i+1}:\n{chunk.page_content}\n")
+            formatted.append(f"Document {i+1}{self._format_location(chunk.metadata)}:\n{chunk.page_content}\n")
         return "\n".join(formatted)
 
+    def _format_location(self, metadata: Dict) -> str:
+        """Source location of a chunk, e.g. ' (police_report.pdf, page 2, ACCIDENT DESCRIPTION)'"""
+        parts = []
+        if metadata.get("document_name"):
+            parts.append(metadata["document_name"])
+        if metadata.get("page_number"):
+            page_end = metadata.get("page_end")
+            if page_end and page_end != metadata["page_number"]:
+                parts.append(f"pages {metadata['page_number']}-{page_end}")
+            else:
+                parts.append(f"page {metadata['page_number']}")
+        if metadata.get("section_heading"):
+            parts.append(metadata["section_heading"])
+        return f" ({', '.join(parts)})" if parts else ""
+
     def _format_context(self, case_context: Dict, user_context: Dict) -> Dict[str, Any]:
         """Format context for prompt"""
         return {
@@ -624,28 +1035,33 @@ async def get_case_context(case_id: str) -> Dict[str, Any]:
     """Get case context from database"""
     db = SessionLocal()
     try:
-        case = db.query(Case).filter(Case.case_id == case_id).first()
+        case = load_case(db, case_id)
         if not case:
             return {}
         
-        parties = db.query(Party).filter(Party.case_id == case_id).all()
-        events = db.query(TimelineEvent).filter(TimelineEvent.case_id == case_id).all()
-        financials = db.query(FinancialRecord).filter(FinancialRecord.case_id == case_id).all()
-        
         return {
             "case": case,
-            "parties": parties,
-            "events": events,
-            "financials": financials
+            "parties": case.parties,
+            "events": case.events,
+            "financials": case.financials
         }
     finally:
         db.close()
 
 async def store_document_chunks(case_id: str, chunks: List[DocumentChunk]) -> str:
     """Store document chunks in database"""
-    # This would typically store in a DocumentChunk table
-    # For now, return a simple ID
-    return f"doc_{case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if not chunks:
+        return f"doc_{case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    await asyncio.to_thread(_record_chunks, case_id, chunks)
+    return f"doc_{chunks[0].metadata['document_hash'][:16]}"
+
+def _record_chunks(case_id: str, chunks: List[DocumentChunk]):
+    db = SessionLocal()
+    try:
+        record_document_chunks(db, case_id, chunks)
+        db.commit()
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     print("This module should be imported and used via the MCP API server.")
@@ -0,0 +1,33 @@
+import json
+from typing import Any, AsyncIterator, Dict
+from fastapi.responses import StreamingResponse
+
+# Server-sent events for streamed RAG answers.
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no"
+}
+
+def sse_event(event: str, data: Any) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(events: AsyncIterator[Dict[str, Any]], **extra: Any) -> StreamingResponse:
+    """Stream ``{"event", "data"}`` dicts as server-sent events.
+
+    ``extra`` fields (e.g. case_id and query) are merged into every event
+    except tokens, which are kept as small as possible. An exception part
+    way through becomes a final ``error`` event, since the 200 status has
+    already been sent.
+    """
+    async def body():
+        try:
+            async for event in events:
+                data = event["data"] if event["event"] == "token" else {**event["data"], **extra}
+                yield sse_event(event["event"], data)
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e), **extra})
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, UploadFile
+from .config import config
+
+# Uploaded documents are staged in uniquely named temp files, copied a chunk
+# at a time so memory per upload stays constant however large the file is.
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes / (1024 * 1024):g} MB limit")
+
+async def save_upload(file: UploadFile, max_bytes: int = None) -> str:
+    """Copy an upload to a new temp file and return its path.
+
+    Raises a 413 HTTPException (leaving nothing behind) once the upload
+    exceeds ``max_bytes``. The caller owns the file and must delete it.
+    """
+    if max_bytes is None:
+        max_bytes = config.upload_max_mb * 1024 * 1024
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise _too_large(max_bytes)
+
+    suffix = os.path.splitext(file.filename or "")[1].lower() or ".pdf"
+    directory = config.upload_dir or None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=directory)
+    try:
+        written = 0
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await file.read(config.upload_chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise _too_large(max_bytes)
+                buffer.write(chunk)
+        return path
+    except BaseException:
+        os.remove(path)
+        raise
+
+@asynccontextmanager
+async def saved_upload(file: UploadFile, max_bytes: int = None):
+    """Stage an upload for the duration of a block, deleting it afterwards"""
+    path = await save_upload(file, max_bytes)
+    try:
+        yield path
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,224 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_community.vectorstores import Chroma
+from langchain.docstore.document import Document
+from .config import config
+from .embeddings import get_embeddings
+from .embedding_backend import embed_array
+
+# Storage modes
+PER_CASE = "per_case"
+SHARDED = "sharded"
+
+SHARDED_COLLECTION = "legal_chunks"
+
+# Touched on every write, so other worker processes know to reopen the store
+UPDATED_STAMP_FILE = ".updated"
+
+def case_store_path(case_id: str) -> str:
+    """On-disk location of a case's vector store (per-case mode)"""
+    return os.path.join(config.chroma_dir, case_id)
+
+def shard_for_case(case_id: str) -> int:
+    """Stable shard number for a case (sharded mode)"""
+    digest = hashlib.sha1(case_id.encode("utf-8")).hexdigest()
+    return int(digest, 16) % max(config.vector_store_shards, 1)
+
+def shard_store_path(shard: int) -> str:
+    return os.path.join(config.chroma_dir, "_shards", f"shard_{shard:03d}")
+
+class CaseVectorStore:
+    """One case's view of the vector store.
+
+    In per-case mode this wraps the case's own Chroma store. In sharded mode
+    it wraps the shared shard collection: every vector carries a
+    ``case_id`` metadata field used as a search filter, and vector IDs are
+    prefixed with the case ID so identical documents in different cases
+    don't collide.
+    """
+
+    def __init__(self, case_id: str, store: Chroma, shared: bool, on_write: Optional[Callable[[], None]] = None):
+        self.case_id = case_id
+        self.store = store
+        self.shared = shared
+        self.on_write = on_write
+
+    def _written(self):
+        if self.on_write is not None:
+            self.on_write()
+
+    @property
+    def filter(self) -> Optional[Dict]:
+        return {"case_id": self.case_id} if self.shared else None
+
+    def _key(self, vector_id: str) -> str:
+        return f"{self.case_id}/{vector_id}" if self.shared else vector_id
+
+    def _unkey(self, key: str) -> str:
+        return key.split("/", 1)[1] if self.shared else key
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict]):
+        if self.shared:
+            metadatas = [{**metadata, "case_id": self.case_id} for metadata in metadatas]
+        # The float32 matrix goes to the collection as-is, without a detour through lists of floats
+        vectors = embed_array(self.store.embeddings, texts)
+        self.store._collection.upsert(
+            ids=[self._key(vector_id) for vector_id in ids],
+            embeddings=vectors,
+            metadatas=metadatas,
+            documents=texts
+        )
+        self.store.persist()
+        self._written()
+
+    def delete(self, ids: List[str]):
+        self.store.delete(ids=[self._key(vector_id) for vector_id in ids])
+        self._written()
+
+    def is_empty(self) -> bool:
+        return not self.store.get(where=self.filter, limit=1, include=[])["ids"]
+
+    def similarity_search_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        return self.store.similarity_search_by_vector(vector, k=k, filter=self.filter)
+
+    def similarity_search_with_ids(self, vector: List[float], k: int) -> List[Tuple[str, Document]]:
+        """(vector_id, document) pairs, closest first; the IDs match those the keyword index uses"""
+        result = self.store._collection.query(
+            query_embeddings=[vector],
+            n_results=k,
+            where=self.filter,
+            include=["documents", "metadatas"]
+        )
+        return [
+            (self._unkey(key), Document(page_content=text, metadata=metadata or {}))
+            for key, text, metadata in zip(result["ids"][0], result["documents"][0], result["metadatas"][0])
+        ]
+
+    def max_marginal_relevance_search_by_vector(self, vector: List[float], k: int) -> List[Document]:
+        return self.store.max_marginal_relevance_search_by_vector(vector, k=k, filter=self.filter)
+
+    def get_all(self) -> List[Tuple[str, str, Dict]]:
+        """Every (vector_id, text, metadata) stored for the case"""
+        data = self.store.get(where=self.filter, include=["documents", "metadatas"])
+        return [
+            (self._unkey(key), text, metadata or {})
+            for key, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        ]
+
+class VectorStoreCache:
+    """LRU cache of open Chroma handles.
+
+    Opening a persisted store is expensive, so handles are kept open and
+    reused across queries. In per-case mode there is one handle per case;
+    in sharded mode there is one per shard, however many cases there are.
+    A handle is reopened when another process has written to its store
+    since it was opened (tracked through the store's update stamp).
+    """
+
+    def __init__(self, capacity: int = 32, mode: str = PER_CASE):
+        self.capacity = capacity
+        self.mode = mode
+        # path -> (update stamp when opened, handle)
+        self._stores: "OrderedDict[str, Tuple[Optional[int], Chroma]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def sharded(self) -> bool:
+        return self.mode == SHARDED
+
+    def _location(self, case_id: str) -> Tuple[str, str]:
+        """(persist directory, collection name) holding a case's vectors"""
+        if self.sharded:
+            return shard_store_path(shard_for_case(case_id)), SHARDED_COLLECTION
+        return case_store_path(case_id), Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(path, UPDATED_STAMP_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _open(self, path: str, collection_name: str) -> Chroma:
+        stamp = self._stamp(path)
+        with self._lock:
+            cached = self._stores.get(path)
+            if cached is not None and cached[0] == stamp:
+                self._stores.move_to_end(path)
+                return cached[1]
+
+        store = Chroma(
+            collection_name=collection_name,
+            persist_directory=path,
+            embedding_function=get_embeddings()
+        )
+
+        with self._lock:
+            # Another request may have opened it meanwhile; keep the first one
+            existing = self._stores.get(path)
+            if existing is not None and existing[0] == stamp:
+                self._stores.move_to_end(path)
+                return existing[1]
+            self._stores[path] = (stamp, store)
+            self._stores.move_to_end(path)
+            while len(self._stores) > self.capacity:
+                self._stores.popitem(last=False)
+            return store
+
+    def _mark_updated(self, path: str):
+        """Touch the store's update stamp after this process wrote to it"""
+        stamp_path = os.path.join(path, UPDATED_STAMP_FILE)
+        with self._lock:
+            before = self._stamp(path)
+            with open(stamp_path, "a"):
+                os.utime(stamp_path)
+            cached = self._stores.get(path)
+            # Our own handle has the write; one that missed another process's write stays stale
+            if cached is not None and cached[0] == before:
+                self._stores[path] = (self._stamp(path), cached[1])
+
+    def _case_store(self, case_id: str, path: str, collection_name: str) -> CaseVectorStore:
+        return CaseVectorStore(
+            case_id, self._open(path, collection_name), self.sharded, on_write=lambda: self._mark_updated(path)
+        )
+
+    def get(self, case_id: str) -> Optional[CaseVectorStore]:
+        """Return the store for a case, or None if it has no documents"""
+        path, collection_name = self._location(case_id)
+        if not os.path.exists(path):
+            return None
+        case_store = self._case_store(case_id, path, collection_name)
+        if self.sharded and case_store.is_empty():
+            return None
+        return case_store
+
+    def open(self, case_id: str) -> CaseVectorStore:
+        """Return the store for a case, creating it if needed (for writers)"""
+        path, collection_name = self._location(case_id)
+        os.makedirs(path, exist_ok=True)
+        return self._case_store(case_id, path, collection_name)
+
+    def search_all(self, vector: List[float], k: int) -> List[Document]:
+        """Firm-wide similarity search across every case (sharded mode only)"""
+        if not self.sharded:
+            raise ValueError("Cross-case search requires VECTOR_STORE_MODE=sharded")
+        scored = []
+        for shard in range(max(config.vector_store_shards, 1)):
+            path = shard_store_path(shard)
+            if not os.path.exists(path):
+                continue
+            store = self._open(path, SHARDED_COLLECTION)
+            scored.extend(store.similarity_search_by_vector_with_relevance_scores(vector, k=k))
+        # Scores are distances: lower is closer
+        scored.sort(key=lambda item: item[1])
+        return [doc for doc, _ in scored[:k]]
+
+    def clear(self):
+        with self._lock:
+            self._stores.clear()
+
+# Global cache instance
+vector_store_cache = VectorStoreCache(capacity=config.chroma_cache_size, mode=config.vector_store_mode)
@@ -18,6 +18,39 @@ import {
   Database
 } from 'lucide-react';
 
+// POST a query to the streaming RAG endpoint and call onEvent(event, data)
+// for each server-sent event (sources, token, done, error)
+async function streamRagQuery(body, onEvent) {
+  const response = await fetch('http://localhost:8000/rag/query/stream', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  });
+  if (!response.ok) {
+    throw new Error(`Query failed with status ${response.status}`);
+  }
+  
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      let event = 'message';
+      let data = '';
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 function App() {
   const [caseId, setCaseId] = useState('2024-PI-001');
   const [isLoading, setIsLoading] = useState(false);
@@ -287,15 +320,21 @@ function App() {
           queryCaseId = caseMatch[1];
         }
         
-        const response = await axios.post('http://localhost:8000/rag/query', {
-          query: query,
-          case_id: queryCaseId,
-          context: {}
+        // Stream the answer so it appears as the LLM generates it
+        setRagResponse('');
+        let answer = '';
+        await streamRagQuery({ query: query, case_id: queryCaseId, context: {} }, (event, data) => {
+          if (event === 'token') {
+            answer += data.text;
+            setRagResponse(answer);
+          } else if (event === 'done') {
+            setRagResponse(data.answer);
+          } else if (event === 'error') {
+            throw new Error(data.detail);
+          }
         });
-        
-        setRagResponse(response.data.answer);
       } catch (err) {
-        setError(err.response?.data?.detail || 'Failed to query RAG');
+        setError(err.message || 'Failed to query RAG');
       } finally {
         setIsQuerying(false);
       }
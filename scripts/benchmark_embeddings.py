@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the embedding backend, for sizing CPU-only ingest nodes.
+
+Embeds chunks of the sample documents (or synthetic text) with every
+combination of batch size and thread count and reports throughput, using
+the configured EMBEDDING_BACKEND. Thread counts go to the backend (torch
+threads, or onnxruntime intra-op threads), which is reloaded per count.
+
+Usage: python scripts/benchmark_embeddings.py [--folder DIR] [--texts N]
+           [--batch-sizes 16,32,64,128] [--threads 1,2,4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.embedding_backend import create_embedding_backend
+
+def load_texts(folder: str, count: int):
+    """Chunk the PDFs in a folder the way ingestion does; fall back to synthetic text"""
+    texts = []
+    if folder and os.path.isdir(folder):
+        from app.ingestion import list_pdf_files
+        from app.pdf_extract import extract_pdf_pages
+        from app.chunking import chunk_pages
+        for path in list_pdf_files(folder):
+            texts.extend(chunk.text for chunk in chunk_pages(extract_pdf_pages(path), 1000, 200))
+    if not texts:
+        texts = [
+            f"On {i % 28 + 1} March 2024 the claimant was treated for injuries sustained in the collision; "
+            f"billed amount ${i * 37 % 9000 + 100:,}.00 under claim CLM-2024-{i:05d}."
+            for i in range(100)
+        ]
+    return [texts[i % len(texts)] for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding throughput")
+    parser.add_argument("--folder", default=config.pdf_dir, help="Folder of PDFs to take text from")
+    parser.add_argument("--texts", type=int, default=512, help="Number of texts to embed per run")
+    parser.add_argument("--batch-sizes", default="16,32,64,128")
+    parser.add_argument("--threads", default=",".join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})))
+    args = parser.parse_args()
+
+    texts = load_texts(args.folder, args.texts)
+    print(f"📊 Model: {config.embedding_model}")
+    print(f"📊 Backend: {config.embedding_backend.value}")
+    print(f"📊 Texts: {len(texts)} (avg {sum(len(t) for t in texts) // len(texts)} chars)")
+
+    print(f"\n{'threads':>8} {'batch':>6} {'seconds':>8} {'texts/s':>9} {'texts/s/thread':>15}")
+    for threads in [int(n) for n in args.threads.split(",")]:
+        # onnxruntime fixes its thread count when the session is created
+        backend = create_embedding_backend(config.embedding_model, num_threads=threads)
+        backend.embed_array(texts[:8])  # warm-up
+        for batch_size in [int(n) for n in args.batch_sizes.split(",")]:
+            backend.batch_size = batch_size
+            start = time.perf_counter()
+            vectors = backend.embed_array(texts)
+            elapsed = time.perf_counter() - start
+            rate = len(texts) / elapsed
+            print(f"{threads:>8} {batch_size:>6} {elapsed:>8.2f} {rate:>9.1f} {rate / threads:>15.1f}")
+    print(f"\n✅ Output: {vectors.dtype} {vectors.shape}, C-contiguous={vectors.flags['C_CONTIGUOUS']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Retrieval-quality regression check for an alternative embedding backend.
+
+Chunks the sample case documents, embeds them with the reference PyTorch
+backend and with the candidate backend, and compares:
+- per-chunk cosine similarity between the two backends' vectors, and
+- overlap of the top-k chunks retrieved for a set of case queries.
+
+Exits non-zero when either falls below its threshold.
+
+Usage: python scripts/check_embedding_backend.py [--backend onnx_int8] [--folder DIR]
+           [--k 5] [--min-cosine 0.98] [--min-recall 0.8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.config import config, EmbeddingBackend
+from app.embedding_backend import create_embedding_backend
+from app.ingestion import list_pdf_files
+from app.pdf_extract import extract_pdf_pages
+from app.chunking import chunk_pages
+
+SAMPLE_CASE_DIR = "challenge/sample_docs/2024-PI-001"
+
+QUERIES = [
+    "Summarize medical expenses and treatment details",
+    "Calculate lost wages and income impact",
+    "Assess pain and suffering factors",
+    "Identify liability and negligence evidence",
+    "What is the insurance claim number?",
+    "What is the policy number and policy limit?",
+    "Which CPT codes were billed?",
+    "What were the gross wages per pay period?",
+    "Where and when did the accident happen?",
+    "What did the police officer conclude about fault?",
+]
+
+def embed(backend, texts):
+    start = time.perf_counter()
+    vectors = backend.embed_array(texts)
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+def top_k(query_vectors, chunk_vectors, k):
+    def unit(m):
+        return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+    scores = unit(query_vectors) @ unit(chunk_vectors).T
+    return [set(row) for row in np.argsort(-scores, axis=1)[:, :k]]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an embedding backend with the PyTorch reference")
+    parser.add_argument("--backend", default=config.embedding_backend.value,
+                        choices=[backend.value for backend in EmbeddingBackend])
+    parser.add_argument("--folder", default=SAMPLE_CASE_DIR)
+    parser.add_argument("--k", type=int, default=config.rag_top_k)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--min-recall", type=float, default=0.8)
+    args = parser.parse_args()
+
+    texts = []
+    for path in list_pdf_files(args.folder):
+        texts.extend(chunk.text for chunk in chunk_pages(extract_pdf_pages(path), 1000, 200))
+    if not texts:
+        print(f"❌ No PDF text found in {args.folder}")
+        sys.exit(1)
+    print(f"📄 {len(texts)} chunks from {args.folder}")
+
+    reference = create_embedding_backend(config.embedding_model, EmbeddingBackend.SENTENCE_TRANSFORMERS)
+    candidate = create_embedding_backend(config.embedding_model, EmbeddingBackend(args.backend))
+
+    ref_chunks, ref_rate = embed(reference, texts)
+    cand_chunks, cand_rate = embed(candidate, texts)
+    print(f"⏱️ {EmbeddingBackend.SENTENCE_TRANSFORMERS.value}: {ref_rate:.1f} texts/s")
+    print(f"⏱️ {args.backend}: {cand_rate:.1f} texts/s")
+
+    cosines = np.sum(ref_chunks * cand_chunks, axis=1) / (
+        np.linalg.norm(ref_chunks, axis=1) * np.linalg.norm(cand_chunks, axis=1)
+    )
+    print(f"📐 Chunk cosine similarity: min {cosines.min():.4f}, mean {cosines.mean():.4f}")
+
+    ref_hits = top_k(reference.embed_array(QUERIES), ref_chunks, args.k)
+    cand_hits = top_k(candidate.embed_array(QUERIES), cand_chunks, args.k)
+    recalls = [len(r & c) / len(r) for r, c in zip(ref_hits, cand_hits)]
+    for query, recall in zip(QUERIES, recalls):
+        print(f"   {recall:.2f}  {query}")
+    mean_recall = sum(recalls) / len(recalls)
+    print(f"🔍 Mean top-{args.k} overlap with reference: {mean_recall:.3f}")
+
+    if cosines.min() < args.min_cosine or mean_recall < args.min_recall:
+        print("❌ Retrieval quality regression")
+        sys.exit(1)
+    print("✅ Backend is compatible with the reference")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Copy per-case vector stores into the sharded collections.
+
+Run with VECTOR_STORE_MODE=sharded after switching modes; chunks are
+re-embedded into their case's shard and keyword indexes are rebuilt.
+"""
+
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.vector_store import vector_store_cache, VectorStoreCache, PER_CASE
+from app.keyword_index import keyword_index_store
+
+def main():
+    if not vector_store_cache.sharded:
+        print("❌ Set VECTOR_STORE_MODE=sharded before migrating")
+        sys.exit(1)
+    if not os.path.isdir(config.chroma_dir):
+        print(f"❌ Vector store directory {config.chroma_dir} not found")
+        sys.exit(1)
+    
+    per_case_stores = VectorStoreCache(capacity=1, mode=PER_CASE)
+    case_ids = sorted(
+        name for name in os.listdir(config.chroma_dir)
+        if os.path.isdir(os.path.join(config.chroma_dir, name)) and not name.startswith("_")
+    )
+    for case_id in case_ids:
+        try:
+            source = per_case_stores.get(case_id)
+            entries = source.get_all() if source is not None else []
+            if entries:
+                ids, texts, metadatas = zip(*entries)
+                vector_store_cache.open(case_id).add(list(ids), list(texts), list(metadatas))
+            keyword_index_store.rebuild(case_id)
+            print(f"✅ {case_id}: migrated {len(entries)} chunks")
+        except Exception as e:
+            print(f"❌ {case_id}: {e}")
+
+if __name__ == "__main__":
+    main()
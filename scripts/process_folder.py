@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """
-Script to process all documents in a folder using the new folder processing API
+Script to process all documents in a folder using the background job API:
+queues the folder, then polls the job and prints per-file progress
 """
 
 import os
 import sys
-import asyncio
+import time
 import requests
 from pathlib import Path
 
@@ -14,11 +15,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.config import config
 
-def process_folder_with_api(folder_path: str, case_id: str, provider: str = "ollama"):
-    """Process all documents in a folder using the new API"""
+API_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+
+def process_folder_with_api(folder_path: str, case_id: str, provider: str = "ollama", poll_interval: float = 2.0):
+    """Queue the folder as a background job and poll it until it finishes"""
     
     # Prepare the request
-    url = "http://127.0.0.1:8000/rag/process_folder_json"
+    url = f"{API_URL}/jobs/process_folder"
     
     data = {
         'folder_path': folder_path,
@@ -31,29 +34,42 @@ def process_folder_with_api(folder_path: str, case_id: str, provider: str = "oll
     try:
         response = requests.post(url, json=data)
         response.raise_for_status()
+        job = response.json()
+        print(f"🕒 Queued job {job['job_id']} ({job['progress']['files_total']} files)")
         
-        result = response.json()
-        print(f"✅ Successfully processed folder: {folder_path}")
-        print(f"   Case ID: {result.get('case_id')}")
-        print(f"   Total Files: {result.get('total_files')}")
-        print(f"   Successful: {result.get('successful_processing')}")
-        print(f"   Failed: {result.get('failed_processing')}")
-        print(f"   Total Chunks: {result.get('summary', {}).get('total_chunks', 0)}")
-        print(f"   LLM Provider: {result.get('summary', {}).get('llm_provider')}")
-        print(f"   LLM Model: {result.get('summary', {}).get('llm_model')}")
-        
-        # Print individual results
-        if result.get('results'):
-            print("\n📄 Processed Documents:")
-            for doc in result['results']:
-                print(f"   ✅ {doc['file_name']} - {doc['chunks_count']} chunks")
+        # Poll the job, printing each file as it finishes
+        reported = set()
+        while True:
+            response = requests.get(f"{API_URL}/jobs/{job['job_id']}")
+            response.raise_for_status()
+            job = response.json()
+            for entry in job['files']:
+                if entry['status'] in ('completed', 'failed') and entry['file_name'] not in reported:
+                    reported.add(entry['file_name'])
+                    done = f"[{len(reported)}/{job['progress']['files_total']}]"
+                    seconds = f"{entry['seconds']:.1f}s" if entry.get('seconds') is not None else "-"
+                    if entry['status'] == 'completed':
+                        print(f"   ✅ {done} {entry['file_name']} - {entry.get('chunks_count', 0)} chunks ({seconds})")
+                    else:
+                        print(f"   ❌ {done} {entry['file_name']} - {entry.get('error')} ({seconds})")
+            if job['status'] in ('completed', 'failed'):
+                break
+            time.sleep(poll_interval)
         
-        if result.get('errors'):
-            print("\n❌ Failed Documents:")
-            for error in result['errors']:
-                print(f"   ❌ {error['file_name']} - {error['error']}")
+        result = job.get('result') or {}
+        print()
+        if job['status'] == 'failed':
+            print(f"❌ Job failed: {job.get('error')}")
+        else:
+            print(f"✅ Successfully processed folder: {folder_path}")
+        print(f"   Case ID: {job.get('case_id')}")
+        print(f"   Total Files: {job['progress']['files_total']}")
+        print(f"   Successful: {result.get('successful_processing', 0)}")
+        print(f"   Failed: {result.get('failed_processing', len(job['files']))}")
+        print(f"   Total Chunks: {result.get('total_chunks', 0)}")
+        print(f"   Elapsed: {job.get('seconds')}s")
         
-        return True
+        return job['status'] == 'completed'
         
     except requests.exceptions.RequestException as e:
         print(f"❌ Error processing folder {folder_path}: {e}")
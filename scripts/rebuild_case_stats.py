@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized case_stats and system_stats tables from scratch
+"""
+
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import SessionLocal
+from app.case_stats import rebuild_case_stats
+
+def main():
+    db = SessionLocal()
+    try:
+        count = rebuild_case_stats(db)
+        db.commit()
+        print(f"✅ Rebuilt case statistics for {count} cases")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Failed to rebuild case statistics: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
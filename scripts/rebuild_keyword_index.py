@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-case BM25 keyword indexes from the existing vector stores
+"""
+
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import config
+from app.db import SessionLocal
+from app.models import DocumentChunk
+from app.vector_store import vector_store_cache
+from app.keyword_index import keyword_index_store
+
+def main():
+    case_ids = sys.argv[1:]
+    if not case_ids and vector_store_cache.sharded:
+        db = SessionLocal()
+        try:
+            case_ids = [row[0] for row in db.query(DocumentChunk.case_id).distinct().order_by(DocumentChunk.case_id)]
+        finally:
+            db.close()
+    elif not case_ids:
+        if not os.path.isdir(config.chroma_dir):
+            print(f"❌ Vector store directory {config.chroma_dir} not found")
+            sys.exit(1)
+        case_ids = sorted(
+            name for name in os.listdir(config.chroma_dir)
+            if os.path.isdir(os.path.join(config.chroma_dir, name)) and not name.startswith("_")
+        )
+    
+    for case_id in case_ids:
+        try:
+            count = keyword_index_store.rebuild(case_id)
+            print(f"✅ {case_id}: indexed {count} chunks")
+        except Exception as e:
+            print(f"❌ {case_id}: {e}")
+
+if __name__ == "__main__":
+    main()
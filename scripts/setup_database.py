@@ -12,6 +12,8 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from datetime import date
 from app.models import Base, Case, Party, TimelineEvent, FinancialRecord
+# Registers the listener that keeps case_stats current on every write
+from app.case_stats import rebuild_case_stats
 
 def create_database():
     """Create the legal_db database if it doesn't exist"""
@@ -306,6 +308,22 @@ def insert_sample_data():
     finally:
         db.close()
 
+def build_case_stats():
+    """Rebuild the materialized case statistics from the current data"""
+    from app.db import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        count = rebuild_case_stats(db)
+        db.commit()
+        print(f"✅ Rebuilt case statistics for {count} cases")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding case statistics: {e}")
+        raise
+    finally:
+        db.close()
+
 def main():
     """Main setup function"""
     print("🚀 Setting up Legal AI Case Management Database")
@@ -315,6 +333,7 @@ def main():
         create_database()
         create_tables()
         insert_sample_data()
+        build_case_stats()
         
         print("\n✅ Database setup complete!")
         print("You can now run the application with:")
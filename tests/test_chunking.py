@@ -0,0 +1,47 @@
+import pytest
+from app.chunking import chunk_pages, is_section_heading
+
+@pytest.mark.parametrize("line", [
+    "ACCIDENT DESCRIPTION",
+    "1. Introduction",
+    "2.3 Damages",
+    "IV. Liability",
+    "Section 4 Remedies",
+    "3. Statement of Facts",
+    "Diagnosis:",
+    "Treatment Plan:",
+])
+def test_headings(line):
+    assert is_section_heading(line)
+
+@pytest.mark.parametrize("line", [
+    # Dosages, addresses, dates and billing codes start with a number but aren't headings
+    "2 tablets twice daily",
+    "1500 Main Street",
+    "1500 Insurance Plaza",
+    "03/15/2024 Follow-up visit",
+    "99213 Office visit",
+    "2024. The claimant returned to work",
+    # Numbered list items are sentences
+    "2. Please obtain repair estimates from licensed auto body shops",
+    "1. Lumbar strain/sprain secondary to MVA",
+    # Label/value pairs, including all-caps identifiers
+    "VIN: 1HGBH41JXMN109876",
+    "Claim No: CLM-2024-001",
+    # Sentence fragments ending in a colon
+    "accident, he had:",
+    "demand is excessive based on:",
+])
+def test_not_headings(line):
+    assert not is_section_heading(line)
+
+def test_chunks_keep_the_real_section():
+    pages = [
+        "MEDICAL RECORDS\n"
+        "Central Valley Medical Group\n"
+        "1500 Insurance Plaza\n"
+        "Patient was prescribed:\n"
+        "2 tablets twice daily for pain.\n"
+    ]
+    chunks = chunk_pages(pages, 1000, 0)
+    assert [chunk.section_heading for chunk in chunks] == ["MEDICAL RECORDS"]